@@ -0,0 +1,114 @@
+"""
+GeoService.cluster_incidents against the previous degree-eps
+implementation on synthetic incidents around Patiala.
+
+    python -m benchmarks.clustering --sizes 1000 10000 100000
+
+Run from backend/. Points are drawn from a few dense hotspots plus
+uniform background noise over the city.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.cluster import DBSCAN
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.geo_service import geo_service  # noqa: E402
+
+
+CATEGORIES = ["theft", "assault", "vandalism", "traffic", "suspicious_activity", "other"]
+SEVERITIES = ["low", "medium", "high", "critical"]
+
+
+def synthetic_incidents(n: int, seed: int = 7, duplicates: float = 0.0) -> list:
+    rng = np.random.default_rng(seed)
+    hotspots = rng.uniform([30.30, 76.34], [30.38, 76.43], size=(40, 2))
+
+    n_hot = int(n * 0.6)
+    centers = hotspots[rng.integers(0, len(hotspots), n_hot)]
+    hot = centers + rng.normal(scale=0.004, size=(n_hot, 2))
+    background = rng.uniform([30.25, 76.30], [30.45, 76.48], size=(n - n_hot, 2))
+    coords = np.vstack([hot, background])
+
+    n_dup = int(n * duplicates)
+    if n_dup:
+        coords[-n_dup:] = coords[rng.integers(0, n - n_dup, n_dup)]
+
+    return [
+        {
+            "id": i,
+            "latitude": float(lat),
+            "longitude": float(lng),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "severity": SEVERITIES[i % len(SEVERITIES)],
+        }
+        for i, (lat, lng) in enumerate(coords)
+    ]
+
+
+def legacy_cluster_incidents(incidents: list, eps_km: float = 0.5) -> list:
+    """The pre-haversine implementation (degree eps, per-cluster Python loops)."""
+    if len(incidents) < 2:
+        return []
+
+    coords = np.array([[inc['latitude'], inc['longitude']] for inc in incidents])
+    clustering = DBSCAN(eps=eps_km / 111.0, min_samples=2).fit(coords)
+
+    clusters = {}
+    for idx, label in enumerate(clustering.labels_):
+        if label == -1:
+            continue
+        clusters.setdefault(label, []).append(incidents[idx])
+
+    severity_map = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+    summaries = []
+    for label, members in clusters.items():
+        center_lat = sum(inc['latitude'] for inc in members) / len(members)
+        center_lng = sum(inc['longitude'] for inc in members) / len(members)
+        severities = [severity_map.get(inc.get('severity', 'medium'), 2) for inc in members]
+        summaries.append({
+            "cluster_id": int(label),
+            "center": {"lat": round(center_lat, 4), "lng": round(center_lng, 4)},
+            "incident_count": len(members),
+            "severity_score": round(sum(severities) / len(severities), 2),
+            "nearest_police_station": geo_service.find_nearest_landmark(center_lat, center_lng, "police_stations"),
+            "incident_ids": [inc.get('id') for inc in members],
+        })
+    return sorted(summaries, key=lambda x: x['severity_score'], reverse=True)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--eps-km", type=float, default=0.1)
+    parser.add_argument("--duplicates", type=float, default=0.0,
+                        help="fraction of reports repeating an earlier report's coordinates")
+    parser.add_argument("--skip-legacy-above", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'points':>9} {'legacy s':>10} {'clusters':>9} {'haversine s':>12} {'clusters':>9}")
+    for n in args.sizes:
+        incidents = synthetic_incidents(n, duplicates=args.duplicates)
+
+        if n <= args.skip_legacy_above:
+            legacy_s, legacy = timed(legacy_cluster_incidents, incidents, eps_km=args.eps_km)
+            legacy_cell = f"{legacy_s:10.2f} {len(legacy):9d}"
+        else:
+            legacy_cell = f"{'-':>10} {'-':>9}"
+
+        current_s, current = timed(geo_service.cluster_incidents, incidents, eps_km=args.eps_km)
+        print(f"{n:9d} {legacy_cell} {current_s:12.2f} {len(current):9d}")
+
+
+if __name__ == "__main__":
+    main()
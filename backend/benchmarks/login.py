@@ -0,0 +1,90 @@
+"""
+Login burst throughput and event-loop stalls, with bcrypt verification
+inline on the loop (the old login path) versus PasswordHasher.
+
+    python -m benchmarks.login --logins 50 --rounds 10 12 --workers 2 4
+
+Run from backend/. While the burst runs, a ticker coroutine measures how
+long the loop goes without being able to run other work, which is what a
+concurrent incident report would wait.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from passlib.context import CryptContext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_service import PasswordHasher  # noqa: E402
+
+
+PASSWORD = "securepass123"
+TICK_SECONDS = 0.005
+
+
+async def measure(burst) -> dict:
+    """Run burst() while sampling loop lag; returns elapsed seconds and the worst stall."""
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal worst_stall
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            worst_stall = max(worst_stall, time.perf_counter() - start - TICK_SECONDS)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await burst()
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return {"elapsed": elapsed, "stall_ms": worst_stall * 1000}
+
+
+async def run(logins: int, rounds: int, workers: int) -> tuple:
+    hasher = PasswordHasher(rounds=rounds, workers=workers)
+    password_hash = hasher.context.hash(PASSWORD)
+    inline_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+    async def inline_login():
+        # What `async def login_user` used to do
+        return inline_context.verify(PASSWORD, password_hash)
+
+    async def inline_burst():
+        await asyncio.gather(*[inline_login() for _ in range(logins)])
+
+    async def offloaded_burst():
+        await asyncio.gather(*[hasher.verify_and_update(PASSWORD, password_hash) for _ in range(logins)])
+
+    inline = await measure(inline_burst)
+    offloaded = await measure(offloaded_burst)
+    hasher.shutdown()
+    return inline, offloaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'workers':>7} {'inline/s':>9} {'stall ms':>9} {'pool/s':>8} {'stall ms':>9}")
+    for rounds in args.rounds:
+        for workers in args.workers:
+            inline, offloaded = asyncio.run(run(args.logins, rounds, workers))
+            print(
+                f"{rounds:6d} {workers:7d}"
+                f" {args.logins / inline['elapsed']:9.1f} {inline['stall_ms']:9.1f}"
+                f" {args.logins / offloaded['elapsed']:8.1f} {offloaded['stall_ms']:9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from config import settings
-from services import db_service
+from services import db_service, ai_classifier, classification_queue, geo_service
 from routes import incidents_router, analytics_router
 from routes.users import router as users_router
+from services.heatmap_service import heatmap_tile_service
+from services.analytics_materializer import analytics_materializer
+from services.response_cache import response_cache
+from services.incident_stream import incident_broker
+from services.notification_service import notification_service
+from services.password_service import password_hasher
+from services.auth_service import user_cache
+from services.dedup_service import duplicate_detector
+from services.trend_service import trend_rollup
 
 
 @asynccontextmanager
@@ -13,6 +23,12 @@ async def lifespan(app: FastAPI):
     print("Starting Urban Safety Intelligence...")
     
     db_service.init_db()
+    recent = await run_in_threadpool(geo_service.load_recent_incidents)
+    print(f"Recent incident index: {recent} incidents from the last {settings.RECENT_INCIDENTS_WINDOW_HOURS:g}h")
+    await classification_queue.start()
+    notification_service.resume_queued()
+    incident_broker.start()
+    await trend_rollup.start()
     
     print(f"{settings.APP_NAME} is ready!")
     print(f"Database: {settings.DATABASE_URL.split('@')[-1]}")  # Hide password
@@ -22,6 +38,11 @@ async def lifespan(app: FastAPI):
     yield
     
     print("Shutting down gracefully...")
+    incident_broker.stop()
+    await trend_rollup.stop()
+    await classification_queue.stop()
+    await notification_service.stop()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -65,10 +86,31 @@ async def health_check():
         "status": "healthy",
         "database": "connected",
         "postgis": settings.POSTGIS_ENABLED,
-        "ai_agent": bool(settings.OPENAI_API_KEY)
+        "ai_agent": bool(settings.OPENAI_API_KEY),
+        "classification_queue": classification_queue.stats(),
+        "classification_cache": ai_classifier.cache.stats(),
+        "rule_classifier": ai_classifier.rules.stats() if ai_classifier.rules else None,
+        "heatmap_tile_cache": heatmap_tile_service.stats(),
+        "analytics": analytics_materializer.stats(),
+        "response_cache": response_cache.stats(),
+        "incident_stream": incident_broker.stats(),
+        "notifications": notification_service.stats(),
+        "password_hashing": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "recent_incidents": geo_service.recent_incidents.stats(),
+        "dedup": duplicate_detector.stats(),
+        "trends": trend_rollup.stats()
     }
 
 
+@app.get("/health/db", tags=["Health"])
+async def database_metrics():
+    """
+    Query latency and connection pool histograms.
+    """
+    return db_service.metrics()
+
+
 app.include_router(users_router)  # User authentication
 app.include_router(incidents_router, prefix="/api", tags=["Incidents"])
 app.include_router(analytics_router, prefix="/api", tags=["Analytics"])
@@ -3,9 +3,11 @@ from .incident import (
     IncidentResponse,
     IncidentListResponse,
     IncidentCategory,
-    IncidentSeverity
+    IncidentSeverity,
+    ClassificationStatus
 )
 from .user import User
+from .analytics import Coordinate, SpatialContextBatchRequest
 
 __all__ = [
     "IncidentCreate",
@@ -13,5 +15,8 @@ __all__ = [
     "IncidentListResponse",
     "IncidentCategory",
     "IncidentSeverity",
-    "User"
+    "ClassificationStatus",
+    "User",
+    "Coordinate",
+    "SpatialContextBatchRequest"
 ]
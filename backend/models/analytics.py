@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class Coordinate(BaseModel):
+    lat: float = Field(..., ge=-90.0, le=90.0)
+    lng: float = Field(..., ge=-180.0, le=180.0)
+
+
+class SpatialContextBatchRequest(BaseModel):
+    points: List[Coordinate] = Field(..., min_length=1, max_length=1000, description="Up to 1000 points")
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "points": [
+                    {"lat": 30.3398, "lng": 76.3869},
+                    {"lat": 30.3281, "lng": 76.4012}
+                ]
+            }
+        }
+    }
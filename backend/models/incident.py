@@ -20,6 +20,12 @@ class IncidentSeverity(str, Enum):
     CRITICAL = "critical"
 
 
+class ClassificationStatus(str, Enum):
+    PENDING = "pending"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
 class IncidentCreate(BaseModel):
 
     title: str = Field(..., min_length=5, max_length=200, description="Brief incident title")
@@ -55,6 +61,8 @@ class IncidentResponse(BaseModel):
     category: Optional[IncidentCategory] = None
     severity: Optional[IncidentSeverity] = None
     ai_summary: Optional[str] = None
+    classification_status: ClassificationStatus = ClassificationStatus.PENDING
+    report_count: int = 1
     
     reporter_name: str
     reporter_phone: str
@@ -74,6 +82,8 @@ class IncidentResponse(BaseModel):
                 "category": "other",
                 "severity": "medium",
                 "ai_summary": "Infrastructure issue: Non-functional street lighting affecting public safety.",
+                "classification_status": "completed",
+                "report_count": 1,
                 "reporter_name": "Priya Sharma",
                 "reporter_phone": "+919876543210",
                 "created_at": "2025-10-13T10:30:00Z",
@@ -84,7 +94,9 @@ class IncidentResponse(BaseModel):
 
 
 class IncidentListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None
+    total_is_estimate: bool = False
     incidents: list[IncidentResponse]
     page: int = 1
     page_size: int = 20
+    next_cursor: Optional[str] = None
@@ -1,11 +1,20 @@
 """
 Analytics API Routes - GIS Clustering and Spatial Intelligence
 """
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
+from functools import partial
+from datetime import datetime, timedelta, timezone
 
+from config import settings
+from models import SpatialContextBatchRequest
 from services import db_service, geo_service
+from services.heatmap_service import heatmap_tile_service, MAX_ZOOM
+from services.analytics_materializer import analytics_materializer
+from services.response_cache import response_cache
+from services.trend_service import trend_rollup, BUCKETS, GROUPS
 
 
 router = APIRouter()
@@ -13,29 +22,48 @@ router = APIRouter()
 
 @router.get("/analytics/clusters")
 async def get_incident_clusters(
+    request: Request,
     eps_km: float = 0.5,
     category: Optional[str] = None,
     db: Session = Depends(db_service.get_session)
 ):
-
-    incidents = db_service.get_incidents(db, skip=0, limit=1000, category=category)
+    """
+    Cluster incidents into unsafe zones.
     
-    incident_data = [
-        {
-            "id": inc.id,
-            "latitude": inc.latitude,
-            "longitude": inc.longitude,
-            "severity": inc.severity.value if inc.severity else "medium",
-            "category": inc.category.value if inc.category else "other"
+    With POSTGIS_ENABLED clustering runs in the database over every
+    matching incident; otherwise the latest ANALYTICS_MAX_INCIDENTS are
+    clustered in Python and "truncated" reports whether the cap was hit.
+    Results are reused until incidents change, at most
+    ANALYTICS_REFRESH_SECONDS stale.
+    """
+    return await response_cache.respond(request, partial(
+        run_in_threadpool,
+        analytics_materializer.cached,
+        ("clusters", eps_km, category),
+        partial(_compute_clusters, db, eps_km, category)
+    ), settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+def _compute_clusters(db: Session, eps_km: float, category: Optional[str]) -> dict:
+    if settings.POSTGIS_ENABLED:
+        result = db_service.cluster_incidents_postgis(db, eps_km, category=category)
+        clusters = geo_service.summarize_clusters(result["clusters"], eps_km)
+        
+        return {
+            "engine": "postgis",
+            "total_incidents": result["total_incidents"],
+            "truncated": False,
+            "total_clusters": len(clusters),
+            "clusters": clusters
         }
-        for inc in incidents
-    ]
     
-    # Get 
-    clusters = geo_service.cluster_incidents(incident_data, eps_km=eps_km)
+    incidents = db_service.get_incidents(db, skip=0, limit=settings.ANALYTICS_MAX_INCIDENTS, category=category)
+    clusters = geo_service.cluster_incidents(_incident_points(incidents), eps_km=eps_km)
     
     return {
+        "engine": "python",
         "total_incidents": len(incidents),
+        "truncated": len(incidents) >= settings.ANALYTICS_MAX_INCIDENTS,
         "total_clusters": len(clusters),
         "clusters": clusters
     }
@@ -43,6 +71,7 @@ async def get_incident_clusters(
 
 @router.get("/analytics/heatmap")
 async def get_heatmap_data(
+    request: Request,
     category: Optional[str] = None,
     db: Session = Depends(db_service.get_session)
 ):
@@ -52,26 +81,56 @@ async def get_heatmap_data(
     Query params:
     - category: Filter by incident category
     """
-    incidents = db_service.get_incidents(db, skip=0, limit=1000, category=category)
+    return await response_cache.respond(request, partial(
+        run_in_threadpool,
+        analytics_materializer.cached,
+        ("heatmap", category),
+        partial(_compute_heatmap, db, category)
+    ), settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+def _compute_heatmap(db: Session, category: Optional[str]) -> dict:
+    incidents = db_service.get_incidents(db, skip=0, limit=settings.ANALYTICS_MAX_INCIDENTS, category=category)
+    return geo_service.generate_heatmap_data(_incident_points(incidents))
+
+
+@router.get("/analytics/heatmap/tiles")
+async def get_heatmap_tiles(
+    request: Request,
+    bbox: str,
+    zoom: int = Query(..., ge=0, le=MAX_ZOOM),
+    category: Optional[str] = None,
+    db: Session = Depends(db_service.get_session)
+):
+    """
+    Pre-aggregated heatmap for the visible map area.
     
-    incident_data = [
-        {
-            "latitude": inc.latitude,
-            "longitude": inc.longitude,
-            "severity": inc.severity.value if inc.severity else "medium",
-            "category": inc.category.value if inc.category else "other"
-        }
-        for inc in incidents
-    ]
+    Query params:
+    - bbox: min_lng,min_lat,max_lng,max_lat of the viewport
+    - zoom: Map zoom level (XYZ tiles covering bbox are returned)
+    - category: Filter by incident category
     
-    heatmap = geo_service.generate_heatmap_data(incident_data)
+    Each tile holds at most bins_per_tile^2 cells of {lat, lng, count, weight}.
+    """
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
     
-    return heatmap
+    try:
+        return await response_cache.respond(request, partial(
+            run_in_threadpool,
+            heatmap_tile_service.get_tiles, db, zoom, (min_lng, min_lat, max_lng, max_lat), category
+        ), settings.ANALYTICS_CACHE_TTL_SECONDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/analytics/danger-zones")
 async def get_danger_zones(
+    request: Request,
     threshold: int = 3,
+    radius_km: float = 1.0,
     db: Session = Depends(db_service.get_session)
 ):
     """
@@ -79,10 +138,45 @@ async def get_danger_zones(
     
     Query params:
     - threshold: Minimum incidents to mark as danger zone (default: 3)
+    - radius_km: Clustering radius of a zone (default: 1.0)
     """
-    incidents = db_service.get_incidents(db, skip=0, limit=1000)
+    return await response_cache.respond(request, partial(
+        run_in_threadpool,
+        analytics_materializer.cached,
+        ("danger-zones", threshold, radius_km),
+        partial(_compute_danger_zones, db, threshold, radius_km)
+    ), settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+def _compute_danger_zones(db: Session, threshold: int, radius_km: float) -> dict:
+    if settings.POSTGIS_ENABLED:
+        result = db_service.cluster_incidents_postgis(db, radius_km)
+        aggregates = [c for c in result["clusters"] if c["incident_count"] >= threshold]
+        clusters = geo_service.summarize_clusters(aggregates, radius_km)
+        danger_zones = geo_service.danger_zones_from_clusters(clusters, threshold=threshold)
+        
+        return {
+            "engine": "postgis",
+            "truncated": False,
+            "total_zones": len(danger_zones),
+            "zones": danger_zones
+        }
     
-    incident_data = [
+    incidents = db_service.get_incidents(db, skip=0, limit=settings.ANALYTICS_MAX_INCIDENTS)
+    danger_zones = geo_service.identify_danger_zones(
+        _incident_points(incidents), threshold=threshold, radius_km=radius_km
+    )
+    
+    return {
+        "engine": "python",
+        "truncated": len(incidents) >= settings.ANALYTICS_MAX_INCIDENTS,
+        "total_zones": len(danger_zones),
+        "zones": danger_zones
+    }
+
+
+def _incident_points(incidents) -> list:
+    return [
         {
             "id": inc.id,
             "latitude": inc.latitude,
@@ -92,13 +186,30 @@ async def get_danger_zones(
         }
         for inc in incidents
     ]
+
+
+@router.get("/analytics/summary")
+async def get_analytics_summary(request: Request):
+    """
+    Incident totals per category and severity.
+    Served from counts maintained as incidents are written.
+    """
+    return await response_cache.respond(
+        request, partial(run_in_threadpool, analytics_materializer.summary), settings.ANALYTICS_CACHE_TTL_SECONDS
+    )
+
+
+@router.post("/analytics/refresh")
+async def refresh_analytics():
+    """
+    Drop materialized analytics and cached results.
+    Use after editing incidents outside the API.
+    """
+    analytics_materializer.invalidate()
+    heatmap_tile_service.clear()
+    response_cache.clear()
     
-    danger_zones = geo_service.identify_danger_zones(incident_data, threshold=threshold)
-    
-    return {
-        "total_zones": len(danger_zones),
-        "zones": danger_zones
-    }
+    return {"status": "invalidated"}
 
 
 @router.get("/analytics/spatial-context")
@@ -110,3 +221,143 @@ async def get_spatial_context(lat: float, lng: float):
     context = geo_service.get_spatial_context(lat, lng)
     
     return context
+
+
+@router.post("/analytics/spatial-context/batch")
+async def get_spatial_context_batch(request: SpatialContextBatchRequest):
+    """
+    Spatial context for up to 1000 points in one call.
+    Results are returned in the same order as the submitted points.
+    """
+    points = [point.model_dump() for point in request.points]
+    contexts = await run_in_threadpool(geo_service.get_spatial_context_batch, points)
+    
+    return {
+        "total": len(contexts),
+        "results": [
+            {"lat": point["lat"], "lng": point["lng"], **context}
+            for point, context in zip(points, contexts)
+        ]
+    }
+
+
+@router.get("/analytics/landmarks")
+async def get_nearby_landmarks(
+    lat: float,
+    lng: float,
+    landmark_type: str = "police_stations",
+    k: int = 5,
+    radius_km: Optional[float] = None
+):
+    """
+    Landmarks of one type around a point, closest first.
+    
+    Query params:
+    - landmark_type: police_stations, hospitals, landmarks, ... (default: police_stations)
+    - k: Number of nearest landmarks (default: 5, max 100)
+    - radius_km: If given, every landmark within this radius instead of the k nearest
+    """
+    if landmark_type not in geo_service.landmark_index.types():
+        raise HTTPException(status_code=404, detail=f"Unknown landmark type '{landmark_type}'")
+    
+    if radius_km is not None:
+        landmarks = geo_service.find_landmarks_within(lat, lng, radius_km, landmark_type)
+    else:
+        landmarks = geo_service.find_nearest_landmarks(lat, lng, landmark_type, k=max(1, min(k, 100)))
+    
+    return {
+        "landmark_type": landmark_type,
+        "total": len(landmarks),
+        "landmarks": landmarks
+    }
+
+
+@router.get("/analytics/nearby")
+async def get_nearby_incidents(
+    lat: float,
+    lng: float,
+    radius_m: float = Query(500, gt=0, le=20000),
+    hours: float = Query(6, gt=0),
+    category: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Incidents reported near a point recently, closest first.
+    
+    Served from the in-memory index of the last
+    RECENT_INCIDENTS_WINDOW_HOURS, without a database query.
+    
+    Query params:
+    - radius_m: Search radius in meters (default: 500, max 20000)
+    - hours: Only incidents created in the last N hours (default: 6)
+    - category: Filter by incident category
+    - limit: Max incidents returned (default: 50, max 500)
+    """
+    if hours > settings.RECENT_INCIDENTS_WINDOW_HOURS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"hours must be at most {settings.RECENT_INCIDENTS_WINDOW_HOURS:g}"
+        )
+    
+    incidents = geo_service.find_recent_incidents(lat, lng, radius_m / 1000, hours, category)
+    
+    return {
+        "radius_m": radius_m,
+        "hours": hours,
+        "total": len(incidents),
+        "incidents": incidents[:limit]
+    }
+
+
+@router.get("/analytics/trends")
+async def get_incident_trends(
+    request: Request,
+    bucket: str = "hour",
+    hours: int = Query(168, ge=1),
+    until: Optional[datetime] = None,
+    group_by: Optional[str] = None,
+    category: Optional[str] = None,
+    severity: Optional[str] = None,
+    bbox: Optional[str] = None
+):
+    """
+    Incident counts over time from the hourly rollup tables.
+    
+    Query params:
+    - bucket: hour, day or week (default: hour)
+    - hours: Length of the window in hours (default: 168)
+    - until: End of the window, UTC (default: end of the current hour)
+    - group_by: Split each bucket by "category" or "severity"
+    - category / severity: Filter ("unclassified" for incidents not yet classified)
+    - bbox: min_lng,min_lat,max_lng,max_lat to restrict to an area
+    
+    Counts lag writes by up to TRENDS_COMPACT_SECONDS +
+    TRENDS_COMPACT_LAG_SECONDS; "compacted_through" is the current watermark.
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(BUCKETS)}")
+    if group_by is not None and group_by not in GROUPS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUPS)}")
+    if hours > settings.TRENDS_MAX_HOURS:
+        raise HTTPException(status_code=400, detail=f"hours must be at most {settings.TRENDS_MAX_HOURS}")
+    
+    area = None
+    if bbox:
+        try:
+            area = tuple(float(part) for part in bbox.split(","))
+            if len(area) != 4:
+                raise ValueError
+        except ValueError:
+            raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+    
+    if until is None:
+        until = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    elif until.tzinfo is not None:
+        # Rollup hours are naive UTC like incidents.created_at
+        until = until.astimezone(timezone.utc).replace(tzinfo=None)
+    since = until - timedelta(hours=hours)
+    
+    return await response_cache.respond(request, partial(
+        run_in_threadpool,
+        trend_rollup.trends, bucket, since, until, group_by, category, severity, area
+    ), settings.ANALYTICS_CACHE_TTL_SECONDS)
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Header
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
+from datetime import datetime
+import base64
+import json
+import tempfile
+
+from config import settings
 
 from models import IncidentCreate, IncidentResponse, IncidentListResponse
-from services import db_service, ai_classifier
+from services import db_service, ai_classifier, classification_queue
 from services.notification_service import notification_service
+from services.ingest_service import incident_ingestor, SUPPORTED_FORMATS
+from services.response_cache import response_cache
+from services.incident_stream import incident_broker
+from services.auth_service import optional_user_id
+from services.dedup_service import duplicate_detector
 
 
 router = APIRouter()
@@ -13,66 +26,217 @@ router = APIRouter()
 @router.post("/incidents", response_model=IncidentResponse, status_code=201)
 async def create_incident(
     incident: IncidentCreate,
+    response: Response,
     user_id: Optional[int] = None,  
+    token_user_id: Optional[int] = Depends(optional_user_id),
     db: Session = Depends(db_service.get_session)
 ):
-    incident_db = db_service.create_incident(db, incident.model_dump())
+    """
+    Report an incident.
     
-    ai_result = ai_classifier.classify(
-        title=incident.title,
-        description=incident.description
-    )
+    Send the login token as "Authorization: Bearer <token>" to alert the
+    reporter's emergency contacts; ?user_id= is still accepted from older clients.
     
-    incident_db = db_service.update_incident_ai_fields(
-        db=db,
-        incident_id=incident_db.id,
-        category=ai_result["category"],
-        severity=ai_result["severity"],
-        ai_summary=ai_result["ai_summary"]
-    )
+    A report matching an incident created nearby within the last
+    DEDUP_WINDOW_MINUTES is attached to it instead: the existing incident
+    is returned with status 200 and a higher report_count, and neither
+    classification nor the police alert are repeated.
+    """
+    reporter_id = token_user_id or user_id
+    incident_data = incident.model_dump()
     
-    notification_result = None
-    if user_id:
-        user = await db_service.get_user_by_id(user_id)
-        if user and user.emergency_contacts:
-            incident_data = {
-                "title": incident.title,
-                "description": incident.description,
-                "latitude": incident.latitude,
-                "longitude": incident.longitude,
-                "category": ai_result["category"],
-                "severity": ai_result["severity"],
-                "ai_summary": ai_result["ai_summary"]
-            }
-            
-            notification_result = notification_service.send_emergency_alert(
-                incident_data=incident_data,
-                emergency_contacts=user.emergency_contacts,
-                user_name=user.name
-            )
-            
-            print(f"\n[SUCCESS] Sent {notification_result['notifications_sent']} emergency alerts!")
+    # Obvious reports are classified instantly by the rule tier/cache; the
+    # rest go to the background queue and are returned as "pending".
+    quick_result = ai_classifier.classify_fast(incident.title, incident.description)
+    if quick_result:
+        incident_data.update(quick_result, classification_status="completed")
+    
+    incident_db = None
+    duplicate = duplicate_detector.find_duplicate(incident_data)
+    if duplicate:
+        incident_db = await run_in_threadpool(
+            db_service.attach_duplicate_report,
+            db, duplicate.incident_id, incident_data, duplicate.similarity, duplicate.distance_m
+        )
+    
+    if incident_db is not None:
+        duplicate_detector.record_attached()
+        response.status_code = 200
+    else:
+        duplicate = None
+        incident_db = await run_in_threadpool(db_service.create_incident, db, incident_data)
+        if not quick_result:
+            classification_queue.submit(incident_db.id, incident.title, incident.description)
+    
+    # Alerts are delivered in the background; the reporter does not wait on them
+    if reporter_id:
+        alert_data = {
+            "title": incident.title,
+            "description": incident.description,
+            "latitude": incident.latitude,
+            "longitude": incident.longitude
+        }
+        if quick_result:
+            alert_data.update(quick_result)
+        
+        notification_service.dispatch_emergency_alert(
+            incident_db.id, alert_data, reporter_id, notify_authority=duplicate is None
+        )
     
     return incident_db
 
 
+@router.post("/incidents/bulk")
+async def bulk_ingest_incidents(request: Request, format: Optional[str] = None):
+    """
+    Bulk-load historical incidents from an NDJSON or CSV request body.
+    
+    Rows are validated like POST /incidents and inserted in chunks; invalid
+    rows are reported individually without aborting the load. Inserted
+    incidents are classified afterwards by the batch backfill.
+    
+    The body is spooled first (in memory up to BULK_INGEST_SPOOL_BYTES,
+    then to a temp file), so loading starts once the upload has finished.
+    
+    Query params:
+    - format: "ndjson" or "csv" (default: inferred from Content-Type)
+    """
+    fmt = format or _format_from_content_type(request.headers.get("content-type", ""))
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Send NDJSON (application/x-ndjson) or CSV (text/csv), or pass ?format="
+        )
+    
+    with tempfile.SpooledTemporaryFile(max_size=settings.BULK_INGEST_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+        spool.seek(0)
+        report = await run_in_threadpool(incident_ingestor.ingest, spool, fmt)
+    
+    if report["inserted"]:
+        classification_queue.schedule_backfill()
+    
+    return report
+
+
+def _format_from_content_type(content_type: str) -> Optional[str]:
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type or "json-seq" in content_type:
+        return "ndjson"
+    return None
+
+
+@router.post("/incidents/classification/backfill", status_code=202)
+async def backfill_classification(include_failed: bool = False):
+    """
+    Classify incidents left pending (e.g. after an Ollama outage) in LLM batches.
+    
+    Query params:
+    - include_failed: Also retry incidents whose classification failed
+    """
+    started = classification_queue.schedule_backfill(include_failed=include_failed)
+    
+    return {
+        "started": started,
+        "queue": classification_queue.stats()
+    }
+
+
 @router.get("/incidents", response_model=IncidentListResponse)
 async def list_incidents(
+    request: Request,
     page: int = 1,
     page_size: int = 20,
     category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(db_service.get_session)
 ):
-    skip = (page - 1) * page_size
-    incidents = db_service.get_incidents(db, skip=skip, limit=page_size, category=category)
-    total = db_service.count_incidents(db, category=category)
+    """
+    List incidents, newest first.
     
-    return {
-        "total": total,
-        "incidents": incidents,
-        "page": page,
-        "page_size": page_size
-    }
+    Query params:
+    - cursor: Opaque next_cursor from the previous page (preferred over page)
+    - page: Legacy offset paging, used only when no cursor is given
+    - include_total: Exact COUNT(*) instead of the planner estimate
+    
+    Responses carry an ETag; send it back as If-None-Match to get a 304
+    while nothing has changed.
+    """
+    async def compute():
+        if cursor or page <= 1:
+            position = _decode_cursor(cursor) if cursor else None
+            incidents = await run_in_threadpool(
+                db_service.get_incidents_after, db, limit=page_size + 1, category=category, cursor=position
+            )
+        else:
+            skip = (page - 1) * page_size
+            incidents = await run_in_threadpool(
+                db_service.get_incidents, db, skip=skip, limit=page_size + 1, category=category
+            )
+        
+        next_cursor = None
+        if len(incidents) > page_size:
+            incidents = incidents[:page_size]
+            next_cursor = _encode_cursor(incidents[-1])
+        
+        total, total_is_estimate = None, False
+        if include_total:
+            total = await run_in_threadpool(db_service.count_incidents, db, category=category)
+        elif not category:
+            total = await run_in_threadpool(db_service.estimate_incidents, db)
+            total_is_estimate = total is not None
+        
+        return IncidentListResponse.model_validate({
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "incidents": incidents,
+            "page": page,
+            "page_size": page_size,
+            "next_cursor": next_cursor
+        }, from_attributes=True)
+    
+    return await response_cache.respond(request, compute, settings.INCIDENT_LIST_CACHE_TTL_SECONDS)
+
+
+def _encode_cursor(incident) -> str:
+    payload = json.dumps([incident.created_at.isoformat(), incident.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, incident_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), int(incident_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/incidents/stream")
+async def stream_incidents(
+    category: Optional[str] = None,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """
+    Server-Sent Events stream of new ("created") and classified ("updated") incidents.
+    
+    Query params:
+    - category: Only incidents in this category
+    - last_event_id: Resume after this event id (browsers send the
+      Last-Event-ID header automatically on reconnect)
+    
+    A "reset" event means the missed events are no longer available and
+    the client should reload GET /api/incidents.
+    """
+    return StreamingResponse(
+        incident_broker.stream(category=category, last_event_id=last_event_id_header or last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.get("/incidents/{incident_id}", response_model=IncidentResponse)
@@ -80,9 +244,68 @@ async def get_incident(
     incident_id: int,
     db: Session = Depends(db_service.get_session)
 ):
-    incident = db_service.get_incident_by_id(db, incident_id)
+    incident = await run_in_threadpool(db_service.get_incident_by_id, db, incident_id)
     
     if not incident:
         raise HTTPException(status_code=404, detail="Incident not found")
     
     return incident
+
+
+@router.get("/incidents/{incident_id}/reports")
+async def get_incident_reports(
+    incident_id: int,
+    db: Session = Depends(db_service.get_session)
+):
+    """Duplicate reports attached to an incident, oldest first"""
+    incident = await run_in_threadpool(db_service.get_incident_by_id, db, incident_id)
+    if not incident:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    
+    reports = await run_in_threadpool(db_service.get_duplicate_reports, db, incident_id)
+    
+    return {
+        "incident_id": incident_id,
+        "reports": [
+            {
+                "id": r.id,
+                "title": r.title,
+                "description": r.description,
+                "latitude": r.latitude,
+                "longitude": r.longitude,
+                "reporter_name": r.reporter_name,
+                "similarity": r.similarity,
+                "distance_m": r.distance_m,
+                "created_at": r.created_at
+            }
+            for r in reports
+        ]
+    }
+
+
+@router.get("/incidents/{incident_id}/notifications")
+async def get_incident_notifications(
+    incident_id: int,
+    db: Session = Depends(db_service.get_session)
+):
+    """Delivery status of the alerts sent for an incident"""
+    notifications = await run_in_threadpool(db_service.get_notifications, db, incident_id)
+    
+    return {
+        "incident_id": incident_id,
+        "notifications": [
+            {
+                "id": n.id,
+                "kind": n.kind,
+                "recipient": n.recipient,
+                "phone": n.phone,
+                "provider": n.provider,
+                "status": n.status,
+                "attempts": n.attempts,
+                "last_error": n.last_error,
+                "created_at": n.created_at,
+                "sent_at": n.sent_at
+            }
+            for n in notifications
+        ]
+    }
@@ -1,13 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
-from passlib.context import CryptContext
 from services.db_service import db_service
+from services.password_service import password_hasher
+from services.auth_service import token_signer, user_cache, current_user_id
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class EmergencyContact(BaseModel):
     name: str = Field(..., min_length=2, max_length=100)
@@ -50,6 +49,18 @@ class UserResponse(BaseModel):
     emergency_contacts: List[Dict[str, str]]
 
 
+class LoginResponse(UserResponse):
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
+class UserUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=2, max_length=100)
+    email: Optional[str] = None
+    emergency_contacts: Optional[List[EmergencyContact]] = None
+
+
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register_user(user_data: UserRegister):
     try:
@@ -57,7 +68,7 @@ async def register_user(user_data: UserRegister):
         if existing:
             raise HTTPException(status_code=400, detail="Phone number already registered")
         
-        password_hash = pwd_context.hash(user_data.password)
+        password_hash = await password_hasher.hash(user_data.password)
         
         emergency_contacts_dict = [c.dict() for c in user_data.emergency_contacts]
         
@@ -83,7 +94,7 @@ async def register_user(user_data: UserRegister):
         raise HTTPException(status_code=500, detail=f"Registration failed: {str(e)}")
 
 
-@router.post("/login", response_model=UserResponse)
+@router.post("/login", response_model=LoginResponse)
 async def login_user(credentials: UserLogin):
     try:
         user = await db_service.get_user_by_phone(credentials.phone)
@@ -91,9 +102,62 @@ async def login_user(credentials: UserLogin):
         if not user:
             raise HTTPException(status_code=401, detail="Invalid phone number or password")
         
-        if not pwd_context.verify(credentials.password, user.password_hash):
+        valid, new_hash = await password_hasher.verify_and_update(credentials.password, user.password_hash)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid phone number or password")
         
+        # Stored with an older cost policy: upgrade while we have the password
+        if new_hash:
+            await db_service.update_password_hash(user.id, new_hash)
+        
+        # The incident path reads the reporter's profile from here
+        user_cache.put(user)
+        
+        return LoginResponse(
+            id=user.id,
+            name=user.name,
+            phone=user.phone,
+            email=user.email,
+            emergency_contacts=user.emergency_contacts or [],
+            access_token=token_signer.issue(user.id),
+            expires_in=token_signer.ttl_seconds
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
+
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user(user_id: int = Depends(current_user_id)):
+    """Profile of the user the Bearer token belongs to"""
+    profile = await user_cache.get(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return UserResponse(**{key: profile[key] for key in UserResponse.model_fields})
+
+
+@router.patch("/me", response_model=UserResponse)
+async def update_current_user(updates: UserUpdate, user_id: int = Depends(current_user_id)):
+    """Update name, email or emergency contacts of the authenticated user"""
+    fields = updates.model_dump(exclude_unset=True)
+    if not fields:
+        raise HTTPException(status_code=400, detail="Nothing to update")
+    
+    not_nullable = [name for name in ("name", "emergency_contacts") if name in fields and fields[name] is None]
+    if not_nullable:
+        raise HTTPException(status_code=400, detail=f"{', '.join(not_nullable)} cannot be null")
+    
+    try:
+        user = await db_service.update_user(user_id, fields)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        # Replace the cached profile so alerts use the new contacts right away
+        user_cache.put(user)
+        
         return UserResponse(
             id=user.id,
             name=user.name,
@@ -105,7 +169,7 @@ async def login_user(credentials: UserLogin):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Update failed: {str(e)}")
 
 
 @router.get("/{user_id}", response_model=UserResponse)
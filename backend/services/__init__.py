@@ -1,5 +1,11 @@
 from .db_service import db_service, DatabaseService
 from .ai_agent import ai_classifier, IncidentClassifier
 from .geo_service import geo_service, GeoService
+from .classification_queue import classification_queue, ClassificationQueue
 
-__all__ = ["db_service", "DatabaseService", "ai_classifier", "IncidentClassifier", "geo_service", "GeoService"]
+__all__ = [
+    "db_service", "DatabaseService",
+    "ai_classifier", "IncidentClassifier",
+    "geo_service", "GeoService",
+    "classification_queue", "ClassificationQueue"
+]
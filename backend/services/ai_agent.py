@@ -8,27 +8,22 @@ except ImportError:
 
 from langchain.prompts import PromptTemplate
 from config import settings
+from .classification_cache import ClassificationCache
+from .rule_classifier import RuleClassifier
+from .db_service import db_service
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 import json
 import re
 
 
-class IncidentClassifier:
- 
-    def __init__(self):
-        self.llm = OllamaLLM(
-            base_url=settings.OLLAMA_BASE_URL,
-            model=settings.OLLAMA_MODEL,
-            temperature=0.3 
-        )
-        
-        self.prompt = PromptTemplate(
-            input_variables=["title", "description"],
-            template="""You are an urban safety analyst. Classify this incident report into the correct category.
+# Bump whenever the prompts change so cached results are not reused
+PROMPT_VERSION = "2"
 
-Incident Title: {title}
-Description: {description}
+VALID_CATEGORIES = ["theft", "assault", "vandalism", "traffic", "suspicious_activity", "other"]
+VALID_SEVERITIES = ["low", "medium", "high", "critical"]
 
-CATEGORY DEFINITIONS (choose EXACTLY ONE):
+CLASSIFICATION_GUIDE = """CATEGORY DEFINITIONS (choose EXACTLY ONE):
 1. "theft" - Any stealing, robbery, burglary, shoplifting, pickpocketing, armed robbery, jewelry store robbery, bike theft, car theft
 2. "assault" - Physical violence, fighting, stabbing, shooting, weapons, battery, attack with knives/guns/weapons
 3. "vandalism" - Property damage, graffiti, broken windows, destruction of property
@@ -50,7 +45,28 @@ SEVERITY LEVELS:
 - medium: Property damage, suspicious activity, minor injuries
 - low: Minor issues, no immediate threat
 
-OUTPUT FORMAT (respond with ONLY this JSON, no other text):
+"""
+
+
+class IncidentClassifier:
+ 
+    def __init__(self):
+        self.llm = OllamaLLM(
+            base_url=settings.OLLAMA_BASE_URL,
+            model=settings.OLLAMA_MODEL,
+            temperature=0.3 
+        )
+        
+        self.prompt = PromptTemplate(
+            input_variables=["title", "description"],
+            template="""You are an urban safety analyst. Classify this incident report into the correct category.
+
+Incident Title: {title}
+Description: {description}
+
+"""
+            + CLASSIFICATION_GUIDE
+            + """OUTPUT FORMAT (respond with ONLY this JSON, no other text):
 {{
   "category": "theft|assault|vandalism|traffic|suspicious_activity|other",
   "severity": "low|medium|high|critical",
@@ -59,44 +75,214 @@ OUTPUT FORMAT (respond with ONLY this JSON, no other text):
         )
         
         self.chain = self.prompt | self.llm
+        
+        self.batch_prompt = PromptTemplate(
+            input_variables=["count", "incidents"],
+            template="""You are an urban safety analyst. Classify each of the {count} incident reports below into the correct category.
+
+{incidents}
+
+"""
+            + CLASSIFICATION_GUIDE
+            + """OUTPUT FORMAT (respond with ONLY this JSON array, one object per incident, in the same order, no other text):
+[
+  {{
+    "index": 1,
+    "category": "theft|assault|vandalism|traffic|suspicious_activity|other",
+    "severity": "low|medium|high|critical",
+    "summary": "Brief description in 10-15 words"
+  }}
+]"""
+        )
+        
+        self.batch_chain = self.batch_prompt | self.llm
+        self.batch_size = max(1, settings.CLASSIFICATION_BATCH_SIZE)
+        self.batch_concurrency = max(1, settings.CLASSIFICATION_BATCH_CONCURRENCY)
+        
+        self.cache = ClassificationCache(database=db_service)
+        self.rules = RuleClassifier() if settings.RULE_CLASSIFIER_ENABLED else None
     
     def classify(self, title: str, description: str) -> dict:
         try:
-            response = self.chain.invoke({
-                "title": title,
-                "description": description
-            })
-            
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                result = json.loads(response)
-            
-            valid_categories = ["theft", "assault", "vandalism", "traffic", "suspicious_activity", "other"]
-            valid_severities = ["low", "medium", "high", "critical"]
-            
-            if result["category"] not in valid_categories:
-                result["category"] = "other"
-            if result["severity"] not in valid_severities:
-                result["severity"] = "medium"
-            
-            return {
-                "category": result["category"],
-                "severity": result["severity"],
-                "ai_summary": result["summary"]
-            }
-            
+            return self.classify_strict(title, description)
         except Exception as e:
             print(f"AI classification error: {e}")
-            return {
-                "category": "other",
-                "severity": "medium",
-                "ai_summary": f"{title} - Pending manual review"
-            }
+            return self.default_result(title)
+    
+    def classify_strict(self, title: str, description: str) -> dict:
+        """
+        Classify without the fallback, so callers (e.g. the background
+        queue) can retry on LLM or parse errors.
+        """
+        quick = self._classify_rules(title, description)
+        if quick is not None:
+            return quick
+        
+        cache_key = self._cache_key(title, description)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        result = self._classify_llm(title, description)
+        self.cache.set(cache_key, result, settings.OLLAMA_MODEL)
+        return result
+    
+    def classify_fast(self, title: str, description: str) -> Optional[dict]:
+        """
+        Rule tier and in-memory cache only; None means the report needs
+        the LLM. Cheap enough to call on the request path.
+        """
+        quick = self._classify_rules(title, description)
+        if quick is not None:
+            return quick
+        return self.cache.get(self._cache_key(title, description), persistent=False)
+    
+    def _classify_rules(self, title: str, description: str) -> Optional[dict]:
+        if self.rules is None:
+            return None
+        return self.rules.classify(title, description)
+    
+    def _cache_key(self, title: str, description: str) -> str:
+        return self.cache.make_key(title, description, settings.OLLAMA_MODEL, PROMPT_VERSION)
+    
+    def _classify_llm(self, title: str, description: str) -> dict:
+        response = self.chain.invoke({
+            "title": title,
+            "description": description
+        })
+        
+        json_match = re.search(r'\{.*\}', response, re.DOTALL)
+        if json_match:
+            result = json.loads(json_match.group())
+        else:
+            result = json.loads(response)
+        
+        return self._normalize(result)
+    
+    def _normalize(self, result: dict) -> dict:
+        if result["category"] not in VALID_CATEGORIES:
+            result["category"] = "other"
+        if result["severity"] not in VALID_SEVERITIES:
+            result["severity"] = "medium"
+        
+        return {
+            "category": result["category"],
+            "severity": result["severity"],
+            "ai_summary": result["summary"]
+        }
+    
+    def default_result(self, title: str) -> dict:
+        return {
+            "category": "other",
+            "severity": "medium",
+            "ai_summary": f"{title} - Pending manual review"
+        }
     
     def classify_batch(self, incidents: list[dict]) -> list[dict]:
-        return [self.classify(inc["title"], inc["description"]) for inc in incidents]
+        """
+        Classify many incidents with one LLM call per chunk of batch_size.
+        
+        Items the model skipped or returned malformed fall back to
+        default_result(), as does every item of a chunk whose call failed.
+        """
+        try:
+            results = self.classify_batch_strict(incidents)
+        except Exception as e:
+            print(f"AI batch classification error: {e}")
+            results = [None] * len(incidents)
+        
+        return [
+            result if result is not None else self.default_result(inc["title"])
+            for inc, result in zip(incidents, results)
+        ]
+    
+    def classify_batch_strict(self, incidents: list[dict]) -> List[Optional[dict]]:
+        """
+        Batch variant of classify_strict().
+        
+        LLM/connection errors are raised so the caller can retry later;
+        items that could not be parsed from an otherwise valid response
+        come back as None. Items the rule tier or cache can answer never
+        reach the LLM.
+        """
+        results: List[Optional[dict]] = [None] * len(incidents)
+        keys = [self._cache_key(inc["title"], inc["description"]) for inc in incidents]
+        
+        # One LLM slot per distinct key; duplicates within the batch share it
+        misses = []
+        first_miss = {}
+        for position, key in enumerate(keys):
+            if key in first_miss:
+                continue
+            results[position] = self._classify_rules(incidents[position]["title"], incidents[position]["description"])
+            if results[position] is None:
+                results[position] = self.cache.get(key)
+            if results[position] is None:
+                first_miss[key] = position
+                misses.append(position)
+        
+        pending = [incidents[position] for position in misses]
+        chunks = [
+            pending[i:i + self.batch_size]
+            for i in range(0, len(pending), self.batch_size)
+        ]
+        
+        if len(chunks) <= 1 or self.batch_concurrency == 1:
+            chunk_results = [self._classify_chunk(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=self.batch_concurrency) as pool:
+                chunk_results = list(pool.map(self._classify_chunk, chunks))
+        
+        fresh = [result for chunk in chunk_results for result in chunk]
+        for position, result in zip(misses, fresh):
+            if result is not None:
+                self.cache.set(keys[position], result, settings.OLLAMA_MODEL)
+            results[position] = result
+        
+        for position, key in enumerate(keys):
+            if results[position] is None and key in first_miss:
+                shared = results[first_miss[key]]
+                results[position] = dict(shared) if shared is not None else None
+        
+        return results
+    
+    def _classify_chunk(self, chunk: list[dict]) -> List[Optional[dict]]:
+        if len(chunk) == 1:
+            try:
+                return [self._classify_llm(chunk[0]["title"], chunk[0]["description"])]
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"AI classification parse error: {e}")
+                return [None]
+        
+        incidents_text = "\n\n".join(
+            f"Incident {n}:\nTitle: {inc['title']}\nDescription: {inc['description']}"
+            for n, inc in enumerate(chunk, start=1)
+        )
+        response = self.batch_chain.invoke({
+            "count": len(chunk),
+            "incidents": incidents_text
+        })
+        
+        results: List[Optional[dict]] = [None] * len(chunk)
+        try:
+            json_match = re.search(r'\[.*\]', response, re.DOTALL)
+            items = json.loads(json_match.group() if json_match else response)
+        except (ValueError, TypeError) as e:
+            print(f"AI batch response parse error: {e}")
+            return results
+        
+        if not isinstance(items, list):
+            return results
+        
+        for position, item in enumerate(items):
+            try:
+                index = int(item.get("index", position + 1)) - 1
+                if 0 <= index < len(chunk) and results[index] is None:
+                    results[index] = self._normalize(item)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+        
+        return results
 
 
 ai_classifier = IncidentClassifier()
@@ -0,0 +1,256 @@
+"""
+In-memory analytics kept up to date by incident writes.
+
+Per-category/severity totals and heatmap bin counts (Web Mercator pixels
+at ANALYTICS_BIN_ZOOM) are adjusted incrementally from the database write
+listener, and rebuilt from one GROUP BY query at most every
+ANALYTICS_REBUILD_SECONDS to absorb writes made by other processes.
+
+Derived results that cannot be patched incrementally (DBSCAN clusters,
+danger zones, raw heatmap points) are memoized per request parameters and
+reused until a write has happened and they are older than
+ANALYTICS_REFRESH_SECONDS, which bounds how stale a reader can be.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from config import settings
+from .db_service import db_service, DatabaseService
+from .geo_service import SEVERITY_SCORES
+from .tiles import Bbox, latlng_to_pixel
+
+
+# Memoized derived results kept at once
+MAX_RESULTS = 256
+
+
+class AnalyticsMaterializer:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        bin_zoom: int = settings.ANALYTICS_BIN_ZOOM,
+        refresh_seconds: float = settings.ANALYTICS_REFRESH_SECONDS,
+        rebuild_seconds: float = settings.ANALYTICS_REBUILD_SECONDS
+    ):
+        self.database = database
+        self.bin_zoom = bin_zoom
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+
+        # (category, severity) -> incident count
+        self._totals: Counter = Counter()
+        # category -> {(px, py): [count, weight]} at bin_zoom
+        self._bins: Dict[Optional[str], Dict[tuple, list]] = {}
+        # key -> (result, version, computed_at)
+        self._results: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self.loaded_at: Optional[float] = None
+        self.version = 0
+
+        self.rebuilds = 0
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        database.add_write_listener(self.on_write)
+
+    def on_write(self, event: str, incidents: List[dict]):
+        """Database write listener: patch counts in place and age out derived results."""
+        with self._lock:
+            self.version += 1
+            self.writes += len(incidents)
+            if self.loaded_at is None:
+                return
+
+            for incident in incidents:
+                if event == "updated":
+                    previous = incident.get("previous") or {}
+                    self._add(incident, previous.get("category"), previous.get("severity"), -1)
+                self._add(incident, incident["category"], incident["severity"], 1)
+
+    def _add(self, incident: dict, category: Optional[str], severity: Optional[str], delta: int):
+        key = (category, severity)
+        self._totals[key] += delta
+        if self._totals[key] <= 0:
+            del self._totals[key]
+
+        x, y = latlng_to_pixel(incident["latitude"], incident["longitude"], self.bin_zoom)
+        pixel = (int(x), int(y))
+        bins = self._bins.setdefault(category, {})
+        cell = bins.setdefault(pixel, [0, 0.0])
+        cell[0] += delta
+        cell[1] += delta * SEVERITY_SCORES.get(severity or "medium", 2) / 4.0
+        if cell[0] <= 0:
+            del bins[pixel]
+
+    def ensure_fresh(self):
+        """Rebuild from the database on first use and every rebuild_seconds."""
+        if self._is_fresh():
+            return
+        with self._rebuild_lock:
+            if not self._is_fresh():
+                self.rebuild()
+
+    def _is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.rebuild_seconds
+
+    def rebuild(self, attempts: int = 3):
+        """
+        Recount from the database.
+
+        A write that commits while the query runs may or may not be in its
+        result, and its listener may fire before or after the swap, so a
+        recount that overlapped any write is discarded and redone. After
+        `attempts` overlapping recounts the last one is kept; the drift is
+        at most the writes that raced it and is fixed by the next rebuild.
+        """
+        for attempt in range(attempts):
+            with self._lock:
+                version = self.version
+
+            totals, bins = self._recount()
+
+            with self._lock:
+                if self.version != version and attempt < attempts - 1:
+                    continue
+                self._totals = totals
+                self._bins = bins
+                self.loaded_at = time.monotonic()
+                self.rebuilds += 1
+                return
+
+    def _recount(self) -> tuple:
+        db = self.database.SessionLocal()
+        try:
+            rows = self.database.incident_bins(db, self.bin_zoom)
+        finally:
+            db.close()
+
+        totals: Counter = Counter()
+        bins: Dict[Optional[str], Dict[tuple, list]] = {}
+        for category, severity, px, py, count in rows:
+            totals[(category, severity)] += count
+            cell = bins.setdefault(category, {}).setdefault((px, py), [0, 0.0])
+            cell[0] += count
+            cell[1] += count * SEVERITY_SCORES.get(severity or "medium", 2) / 4.0
+        return totals, bins
+
+    def invalidate(self):
+        """Drop every materialized count and memoized result; the next read rebuilds."""
+        with self._lock:
+            self.version += 1
+            self.loaded_at = None
+            self._results.clear()
+
+    def summary(self) -> dict:
+        """Incident totals overall, per category and per severity."""
+        self.ensure_fresh()
+        by_category: Counter = Counter()
+        by_severity: Counter = Counter()
+        with self._lock:
+            for (category, severity), count in self._totals.items():
+                by_category[category or "unclassified"] += count
+                by_severity[severity or "unclassified"] += count
+            age = time.monotonic() - self.loaded_at
+
+        return {
+            "total_incidents": sum(by_category.values()),
+            "by_category": dict(by_category),
+            "by_severity": dict(by_severity),
+            "rebuilt_seconds_ago": round(age, 1)
+        }
+
+    def heatmap_bins(self, pixel_zoom: int, bbox: Bbox, category: Optional[str] = None) -> Optional[List[tuple]]:
+        """
+        [(px, py, incident_count, weight)] at pixel_zoom inside bbox, rolled
+        up from the materialized bins; None if pixel_zoom is finer than bin_zoom.
+        """
+        if pixel_zoom > self.bin_zoom:
+            return None
+        self.ensure_fresh()
+
+        shift = self.bin_zoom - pixel_zoom
+        min_lng, min_lat, max_lng, max_lat = bbox
+        x0, y0 = latlng_to_pixel(max_lat, min_lng, self.bin_zoom)
+        x1, y1 = latlng_to_pixel(min_lat, max_lng, self.bin_zoom)
+
+        with self._lock:
+            if category:
+                cells = [(pixel, tuple(cell)) for pixel, cell in self._bins.get(category, {}).items()]
+            else:
+                cells = [(pixel, tuple(cell)) for bins in self._bins.values() for pixel, cell in bins.items()]
+
+        if not cells:
+            return []
+
+        pixels = np.array([pixel for pixel, _ in cells], dtype=np.int64)
+        values = np.array([cell for _, cell in cells], dtype=float)
+        inside = (
+            (pixels[:, 0] >= int(x0)) & (pixels[:, 0] <= int(x1))
+            & (pixels[:, 1] >= int(y0)) & (pixels[:, 1] <= int(y1))
+        )
+        if not inside.any():
+            return []
+
+        rolled, codes = np.unique(pixels[inside] >> shift, axis=0, return_inverse=True)
+        codes = codes.reshape(-1)
+        counts = np.bincount(codes, weights=values[inside, 0], minlength=len(rolled))
+        weights = np.bincount(codes, weights=values[inside, 1], minlength=len(rolled))
+
+        return [
+            (int(px), int(py), int(count), float(weight))
+            for (px, py), count, weight in zip(rolled, counts, weights)
+        ]
+
+    def cached(self, key: Hashable, compute: Callable[[], dict]) -> dict:
+        """
+        Memoized compute() for derived analytics.
+
+        A result is reused while no incident has been written since it was
+        computed, or while it is younger than refresh_seconds; never past
+        rebuild_seconds, since writes from other processes are not seen.
+        """
+        now = time.monotonic()
+        with self._lock:
+            version = self.version
+            entry = self._results.get(key)
+            if entry is not None:
+                result, computed_version, computed_at = entry
+                age = now - computed_at
+                if age < self.rebuild_seconds and (computed_version == version or age < self.refresh_seconds):
+                    self._results.move_to_end(key)
+                    self.hits += 1
+                    return result
+            self.misses += 1
+
+        result = compute()
+
+        with self._lock:
+            self._results[key] = (result, version, now)
+            self._results.move_to_end(key)
+            while len(self._results) > MAX_RESULTS:
+                self._results.popitem(last=False)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded_at is not None,
+                "version": self.version,
+                "writes": self.writes,
+                "rebuilds": self.rebuilds,
+                "bins": sum(len(bins) for bins in self._bins.values()),
+                "results": len(self._results),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+analytics_materializer = AnalyticsMaterializer(db_service)
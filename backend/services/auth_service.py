@@ -0,0 +1,173 @@
+"""
+Stateless session tokens and an in-process user profile cache.
+
+Tokens are "<payload>.<signature>": a base64url JSON payload with the user
+id and expiry, signed with HMAC-SHA256 over SECRET_KEY, so verifying one
+needs no database access. The user cache keeps the profile fields the
+incident path needs (name and emergency contacts); a profile update
+replaces the cached entry.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from config import settings
+from .db_service import db_service, DatabaseService
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# Values copied from examples and tutorials; a key anyone can guess signs anyone's session
+PLACEHOLDER_KEYS = frozenset({"change-me", "changeme", "secret", "secret-key", "your-secret-key"})
+
+
+class TokenSigner:
+
+    def __init__(
+        self,
+        secret_key: str = settings.SECRET_KEY,
+        ttl_seconds: int = settings.SESSION_TOKEN_TTL_SECONDS,
+        debug: bool = settings.DEBUG
+    ):
+        if secret_key.strip().lower() in PLACEHOLDER_KEYS:
+            raise ValueError("SECRET_KEY is a placeholder value; set it to a long random string")
+        if not secret_key:
+            if not debug:
+                raise ValueError("SECRET_KEY must be set when DEBUG is off")
+            # Each process gets its own key, so tokens issued by one worker fail on the others
+            print("[WARN] SECRET_KEY is not set; using a random key. Run a single worker; sessions end on restart")
+            secret_key = secrets.token_urlsafe(32)
+        self._key = secret_key.encode()
+        self.ttl_seconds = ttl_seconds
+
+    def issue(self, user_id: int) -> str:
+        payload = _b64encode(json.dumps(
+            {"sub": user_id, "exp": int(time.time()) + self.ttl_seconds},
+            separators=(",", ":")
+        ).encode())
+        return f"{payload}.{self._sign(payload)}"
+
+    def verify(self, token: str) -> Optional[int]:
+        """User id for a valid, unexpired token; otherwise None"""
+        payload, _, signature = token.partition(".")
+        # Compared as bytes: compare_digest rejects non-ASCII str with TypeError
+        if not payload or not hmac.compare_digest(signature.encode(), self._sign(payload).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+        if claims.get("exp", 0) < time.time():
+            return None
+        return int(claims["sub"])
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._key, payload.encode(), hashlib.sha256).digest())
+
+
+class UserCache:
+    """LRU + TTL cache of user profiles as plain dicts"""
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        max_entries: int = settings.USER_CACHE_SIZE,
+        ttl_seconds: int = settings.USER_CACHE_TTL_SECONDS
+    ):
+        self.database = database
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                profile, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return profile
+                del self._entries[user_id]
+            self.misses += 1
+
+        user = await self.database.get_user_by_id(user_id)
+        if user is None:
+            return None
+        return self.put(user)
+
+    def put(self, user) -> dict:
+        """Cache a UserDB row (e.g. just loaded by login or updated) and return its profile"""
+        profile = {
+            "id": user.id,
+            "name": user.name,
+            "phone": user.phone,
+            "email": user.email,
+            "emergency_contacts": user.emergency_contacts or []
+        }
+        with self._lock:
+            self._entries[user.id] = (profile, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return profile
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+token_signer = TokenSigner()
+user_cache = UserCache(db_service)
+
+
+def _bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Expected 'Authorization: Bearer <token>'")
+    return token.strip()
+
+
+async def optional_user_id(authorization: Optional[str] = Header(None)) -> Optional[int]:
+    """Dependency: user id from a Bearer token, None without one, 401 if it is invalid"""
+    token = _bearer_token(authorization)
+    if token is None:
+        return None
+    user_id = token_signer.verify(token)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return user_id
+
+
+async def current_user_id(authorization: Optional[str] = Header(None)) -> int:
+    """Dependency: user id from a required Bearer token"""
+    user_id = await optional_user_id(authorization)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user_id
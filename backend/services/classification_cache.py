@@ -0,0 +1,116 @@
+"""
+Content-addressed cache for AI classification results.
+
+Reports are keyed on a hash of their normalized title + description plus
+the model name and prompt version, so repeated reports of the same scene
+skip the LLM while a model or prompt change naturally misses.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from config import settings
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class ClassificationCache:
+
+    def __init__(
+        self,
+        database=None,
+        max_entries: int = settings.CLASSIFICATION_CACHE_SIZE,
+        ttl_seconds: int = settings.CLASSIFICATION_CACHE_TTL_SECONDS,
+        persistent: bool = settings.CLASSIFICATION_CACHE_PERSISTENT
+    ):
+        self.database = database
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent and database is not None
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+
+    def make_key(self, title: str, description: str, model: str, prompt_version: str) -> str:
+        payload = "\x1f".join([
+            normalize_text(title),
+            normalize_text(description),
+            model,
+            prompt_version
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, persistent: bool = True) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                result, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self._entries[key]
+
+        if self.persistent and persistent:
+            try:
+                result = self.database.get_cached_classification(key, self.ttl_seconds)
+            except Exception as e:
+                print(f"Classification cache lookup failed: {e}")
+                result = None
+            if result is not None:
+                self._remember(key, result)
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                return dict(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, result: dict, model: str):
+        self._remember(key, result)
+        if self.persistent:
+            try:
+                self.database.store_cached_classification(key, result, model)
+            except Exception as e:
+                print(f"Classification cache write failed: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent_hits": self.persistent_hits,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _remember(self, key: str, result: dict):
+        with self._lock:
+            self._entries[key] = (dict(result), time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
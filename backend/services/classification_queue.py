@@ -0,0 +1,230 @@
+"""
+Background AI classification queue.
+
+Incidents are stored as "pending" and classified by a bounded pool of
+async workers, so a slow LLM never holds up the request that created them.
+Anything the queue could not take (overflow, restarts, LLM outages) is
+picked up by backfill(), which classifies pending rows in LLM batches.
+"""
+import asyncio
+from typing import List, Optional, Set
+from dataclasses import dataclass
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from .ai_agent import ai_classifier, IncidentClassifier
+from .db_service import db_service, DatabaseService
+
+
+@dataclass
+class ClassificationJob:
+    incident_id: int
+    title: str
+    description: str
+
+
+class ClassificationQueue:
+
+    def __init__(
+        self,
+        classifier: IncidentClassifier,
+        database: DatabaseService,
+        workers: int = settings.CLASSIFICATION_WORKERS,
+        max_size: int = settings.CLASSIFICATION_QUEUE_SIZE,
+        max_retries: int = settings.CLASSIFICATION_MAX_RETRIES,
+        retry_backoff: float = settings.CLASSIFICATION_RETRY_BACKOFF_SECONDS
+    ):
+        self.classifier = classifier
+        self.database = database
+        self.worker_count = workers
+        self.max_size = max_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._backfill_task: Optional[asyncio.Task] = None
+        self._in_flight: Set[int] = set()
+        self._overflowed = False
+
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self):
+        """Create the queue on the running loop and spawn the workers."""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(self.worker_count)
+        ]
+        self.schedule_backfill()
+        print(f"Classification queue started ({self.worker_count} workers)")
+
+    async def stop(self):
+        tasks = list(self._workers)
+        if self._backfill_task:
+            tasks.append(self._backfill_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._backfill_task = None
+
+    def submit(self, incident_id: int, title: str, description: str) -> bool:
+        """
+        Enqueue an incident without waiting.
+
+        Returns False when the queue is full (backpressure); the incident
+        stays "pending" in the database and is picked up by backfill()
+        once the workers catch up.
+        """
+        if self._queue is None or incident_id in self._in_flight:
+            return False
+
+        try:
+            self._queue.put_nowait(ClassificationJob(incident_id, title, description))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            self._overflowed = True
+            return False
+
+        self._in_flight.add(incident_id)
+        return True
+
+    def schedule_backfill(self, include_failed: bool = False) -> bool:
+        """Start a backfill in the background unless one is already running."""
+        if self._queue is None or (self._backfill_task and not self._backfill_task.done()):
+            return False
+        self._backfill_task = asyncio.create_task(self.backfill(include_failed))
+        return True
+
+    async def backfill(self, include_failed: bool = False):
+        """
+        Classify every pending (and optionally failed) incident in batches.
+
+        Rows are walked in id order, one page per classify_batch_strict()
+        call. If the LLM is unreachable the page is retried with backoff and
+        the run stops, leaving the rest pending for the next backfill.
+        """
+        statuses = ("pending", "failed") if include_failed else ("pending",)
+        page_size = self.classifier.batch_size * self.classifier.batch_concurrency
+        after_id = 0
+        total = 0
+
+        while True:
+            jobs = await run_in_threadpool(self._load_pending, page_size, after_id, statuses)
+            if not jobs:
+                break
+            after_id = jobs[-1].incident_id
+            jobs = [job for job in jobs if job.incident_id not in self._in_flight]
+            if not jobs:
+                continue
+
+            self._in_flight.update(job.incident_id for job in jobs)
+            try:
+                results = await self._classify_batch(jobs)
+                if results is None:
+                    break
+                await run_in_threadpool(self._store_batch, jobs, results)
+            finally:
+                self._in_flight.difference_update(job.incident_id for job in jobs)
+            total += len(jobs)
+
+        if total:
+            print(f"Classification backfill finished: {total} incidents")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "in_flight": len(self._in_flight),
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "backfill_running": bool(self._backfill_task and not self._backfill_task.done())
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                print(f"[CLASSIFIER {worker_id}] Incident {job.incident_id} failed: {e}")
+            finally:
+                self._in_flight.discard(job.incident_id)
+                self._queue.task_done()
+
+            if self._overflowed and self._queue.empty():
+                self._overflowed = False
+                self.schedule_backfill()
+
+    async def _process(self, job: ClassificationJob):
+        status = "completed"
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                result = await run_in_threadpool(
+                    self.classifier.classify_strict, job.title, job.description
+                )
+                break
+            except Exception as e:
+                print(f"AI classification error (incident {job.incident_id}, attempt {attempt}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+        else:
+            result = self.classifier.default_result(job.title)
+            status = "failed"
+            self.failed += 1
+
+        await run_in_threadpool(self._store, job.incident_id, result, status)
+        self.processed += 1
+
+    async def _classify_batch(self, jobs: List[ClassificationJob]) -> Optional[List[Optional[dict]]]:
+        incidents = [{"title": job.title, "description": job.description} for job in jobs]
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                return await run_in_threadpool(self.classifier.classify_batch_strict, incidents)
+            except Exception as e:
+                print(f"AI batch classification error (attempt {attempt}): {e}")
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+        return None
+
+    def _store(self, incident_id: int, result: dict, status: str):
+        db = self.database.SessionLocal()
+        try:
+            self.database.update_incident_ai_fields(
+                db=db,
+                incident_id=incident_id,
+                category=result["category"],
+                severity=result["severity"],
+                ai_summary=result["ai_summary"],
+                classification_status=status
+            )
+        finally:
+            db.close()
+
+    def _store_batch(self, jobs: List[ClassificationJob], results: List[Optional[dict]]):
+        for job, result in zip(jobs, results):
+            status = "completed"
+            if result is None:
+                result = self.classifier.default_result(job.title)
+                status = "failed"
+                self.failed += 1
+            self._store(job.incident_id, result, status)
+            self.processed += 1
+
+    def _load_pending(self, limit: int, after_id: int, statuses: tuple) -> List[ClassificationJob]:
+        db = self.database.SessionLocal()
+        try:
+            return [
+                ClassificationJob(inc.id, inc.title, inc.description)
+                for inc in self.database.get_pending_incidents(
+                    db, limit=limit, after_id=after_id, statuses=statuses
+                )
+            ]
+        finally:
+            db.close()
+
+
+classification_queue = ClassificationQueue(ai_classifier, db_service)
@@ -0,0 +1,125 @@
+"""
+Query and connection-pool instrumentation for DatabaseService.
+
+Statement timings come from SQLAlchemy cursor events; pool checkout wait
+is timed inside the pool itself, so slow queries and pool exhaustion show
+up as separate histograms.
+"""
+import threading
+import time
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from config import settings
+
+
+# Upper bounds in milliseconds; the last bucket catches everything above
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+class Histogram:
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "count": self.count,
+                "sum_ms": round(self.total, 3),
+                "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+                "max_ms": round(self.max, 3),
+                "buckets": buckets
+            }
+
+
+class DBMetrics:
+
+    def __init__(self):
+        self.query_latency = Histogram()
+        self.checkout_wait = Histogram()
+        self.checkout_errors = 0
+        self._lock = threading.Lock()
+
+    def record_checkout_error(self):
+        with self._lock:
+            self.checkout_errors += 1
+
+    def snapshot(self, engine: Engine) -> dict:
+        pool = engine.pool
+        pool_state = {"status": pool.status()}
+        if isinstance(pool, QueuePool):
+            pool_state.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow()
+            })
+
+        return {
+            "queries": self.query_latency.snapshot(),
+            "pool_checkout_wait": self.checkout_wait.snapshot(),
+            "pool_checkout_errors": self.checkout_errors,
+            "pool": pool_state
+        }
+
+
+db_metrics = DBMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            db_metrics.record_checkout_error()
+            raise
+        finally:
+            db_metrics.checkout_wait.observe((time.perf_counter() - start) * 1000)
+
+
+def instrument_engine(engine: Engine):
+    """Time every statement executed through the engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_start"].pop()) * 1000
+        db_metrics.query_latency.observe(elapsed_ms)
+        if settings.DB_SLOW_QUERY_MS and elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+            print(f"[SLOW QUERY] {elapsed_ms:.1f}ms: {' '.join(statement.split())[:300]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _discard_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
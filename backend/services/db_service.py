@@ -1,12 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, Float, DateTime, Enum, JSON
+from sqlalchemy import create_engine, inspect, text, insert, update, select, case, func, bindparam, tuple_, and_, or_, Index, Column, Integer, String, Text, Float, DateTime, Enum, JSON
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from fastapi.concurrency import run_in_threadpool
 from geoalchemy2 import Geometry
-from datetime import datetime
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
 import enum
 
 from config import settings
+from .db_metrics import InstrumentedQueuePool, instrument_engine, db_metrics
 
 
 Base = declarative_base()
@@ -43,6 +46,15 @@ class UserDB(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
+# Numeric severity used for cluster scores (unclassified counts as medium)
+SEVERITY_SCORES = {
+    IncidentSeverityDB.LOW: 1,
+    IncidentSeverityDB.MEDIUM: 2,
+    IncidentSeverityDB.HIGH: 3,
+    IncidentSeverityDB.CRITICAL: 4,
+}
+
+
 class IncidentDB(Base):
     """
     SQLAlchemy ORM model for incidents table.
@@ -51,15 +63,35 @@ class IncidentDB(Base):
     - Uses GeoAlchemy2's Geometry type for PostGIS POINT storage
     - Timestamps with automatic updates
     - AI-generated fields (category, severity, summary)
+    - classification_status tracks the background classification queue
     """
     
     __tablename__ = "incidents"
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_incidents_created_at_id", "created_at", "id"),
+        # Category / severity filtered lists and analytics, newest first
+        Index("ix_incidents_category_created_at", "category", "created_at"),
+        Index("ix_incidents_severity_created_at", "severity", "created_at"),
+        # Trend rollup compactor: rows written since its watermark
+        Index("ix_incidents_updated_at", "updated_at"),
+        # Spatial queries (ST_DWithin, ST_ClusterDBSCAN, bbox filters).
+        # Same name GeoAlchemy2 gives its automatic index, so existing
+        # databases keep the one they already have.
+        Index("idx_incidents_location", "location", postgresql_using="gist"),
+        # Classification backfill scans only the rows still to classify
+        Index(
+            "ix_incidents_unclassified",
+            "id",
+            postgresql_where=text("classification_status IN ('pending', 'failed')")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=False)
     
-    location = Column(Geometry('POINT', srid=4326), nullable=False)
+    location = Column(Geometry('POINT', srid=4326, spatial_index=False), nullable=False)
     
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
@@ -67,6 +99,9 @@ class IncidentDB(Base):
     category = Column(Enum(IncidentCategoryDB), nullable=True)
     severity = Column(Enum(IncidentSeverityDB), nullable=True)
     ai_summary = Column(Text, nullable=True)
+    classification_status = Column(String(20), default="pending", nullable=False)
+    # Reports of this incident, including the first; see DuplicateReportDB
+    report_count = Column(Integer, default=1, nullable=False)
     
     reporter_name = Column(String(100), nullable=False)
     reporter_phone = Column(String(20), nullable=False)
@@ -75,6 +110,99 @@ class IncidentDB(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
 
+def incident_snapshot(incident) -> dict:
+    """Plain-dict copy of an incident row for write listeners (enums as values)"""
+    return {
+        "id": incident.id,
+        "title": incident.title,
+        "description": incident.description,
+        "latitude": incident.latitude,
+        "longitude": incident.longitude,
+        "category": incident.category.value if incident.category else None,
+        "severity": incident.severity.value if incident.severity else None,
+        "ai_summary": incident.ai_summary,
+        "classification_status": incident.classification_status,
+        "report_count": incident.report_count,
+        "reporter_name": incident.reporter_name,
+        "reporter_phone": incident.reporter_phone,
+        "created_at": incident.created_at,
+        "updated_at": incident.updated_at
+    }
+
+
+class ClassificationCacheDB(Base):
+    """Persistent tier of the AI classification cache, keyed by content hash"""
+    __tablename__ = "classification_cache"
+    
+    cache_key = Column(String(64), primary_key=True)
+    category = Column(String(30), nullable=False)
+    severity = Column(String(20), nullable=False)
+    ai_summary = Column(Text, nullable=False)
+    model = Column(String(100), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class DuplicateReportDB(Base):
+    """A report attached to an existing incident instead of becoming a new one"""
+    __tablename__ = "duplicate_reports"
+    
+    id = Column(Integer, primary_key=True)
+    incident_id = Column(Integer, index=True, nullable=False)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=False)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    reporter_name = Column(String(100), nullable=False)
+    reporter_phone = Column(String(20), nullable=False)
+    similarity = Column(Float, nullable=False)
+    distance_m = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IncidentRollupDB(Base):
+    """
+    Incident counts per hour (of created_at), category, severity and grid
+    cell (XYZ tile at TRENDS_CELL_ZOOM); unclassified incidents are counted
+    under "unclassified". Maintained by the trend rollup compactor.
+    """
+    __tablename__ = "incident_rollups"
+    
+    hour = Column(DateTime, primary_key=True)
+    category = Column(String(30), primary_key=True)
+    severity = Column(String(20), primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    incident_count = Column(Integer, nullable=False)
+    report_count = Column(Integer, nullable=False)
+
+
+class RollupStateDB(Base):
+    """High-water mark of incidents.updated_at already folded into a rollup"""
+    __tablename__ = "rollup_state"
+    
+    name = Column(String(50), primary_key=True)
+    cell_zoom = Column(Integer, nullable=False)
+    watermark = Column(DateTime, nullable=True)
+
+
+class NotificationDB(Base):
+    """Delivery record for one alert to one recipient"""
+    __tablename__ = "notifications"
+    
+    id = Column(Integer, primary_key=True)
+    incident_id = Column(Integer, index=True, nullable=False)
+    kind = Column(String(20), nullable=False)  # emergency_contact | authority
+    recipient = Column(String(100), nullable=False)
+    phone = Column(String(20), nullable=True)
+    provider = Column(String(30), nullable=False)
+    status = Column(String(20), default="queued", nullable=False)  # queued | retrying | sent | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = Column(DateTime, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)  # set when a restarted process takes the delivery over
+
+
 class DatabaseService:
     
     def __init__(self):
@@ -83,10 +211,39 @@ class DatabaseService:
         """
         self.engine = create_engine(
             settings.DATABASE_URL,
-            echo=settings.DEBUG,  
+            echo=settings.DB_ECHO,
             pool_pre_ping=True,   
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
         )
-        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        instrument_engine(self.engine)
+        # expire_on_commit=False: rows returned by INSERT/UPDATE ... RETURNING
+        # stay usable after commit without being re-selected
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self._write_listeners: List[Callable[[str, List[dict]], None]] = []
+    
+    def add_write_listener(self, listener: Callable[[str, List[dict]], None]):
+        """
+        Call listener(event, incidents) after every committed incident write.
+        
+        event is "created" or "updated"; incidents are incident_snapshot()
+        dicts, and updated ones also carry "previous" with the category and
+        severity they had before. Listeners run on the writing thread and
+        must be quick; their exceptions are logged and swallowed.
+        """
+        self._write_listeners.append(listener)
+    
+    def _notify_write(self, event: str, incidents: List[dict]):
+        if not incidents:
+            return
+        for listener in self._write_listeners:
+            try:
+                listener(event, incidents)
+            except Exception as e:
+                print(f"Incident write listener {getattr(listener, '__qualname__', listener)} failed: {e}")
     
     def init_db(self):
         """
@@ -96,7 +253,7 @@ class DatabaseService:
         """
         with self.engine.connect() as conn:
             try:
-                conn.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis;"))
                 conn.commit()
                 print("PostGIS extension enabled")
             except Exception as e:
@@ -104,8 +261,54 @@ class DatabaseService:
         
         # Create all tables
         Base.metadata.create_all(bind=self.engine)
+        self._migrate()
         print("Database tables created")
     
+    def _migrate(self):
+        """
+        Bring an existing schema up to date.
+        
+        create_all() only creates missing tables, so columns added since
+        the initial schema and the managed index set (every Index declared
+        on the models) are created here if missing.
+        """
+        with self.engine.begin() as conn:
+            # Rows written before the queue existed were classified inline
+            conn.execute(text(
+                "ALTER TABLE incidents ADD COLUMN IF NOT EXISTS "
+                "classification_status VARCHAR(20) NOT NULL DEFAULT 'completed'"
+            ))
+            conn.execute(text(
+                "ALTER TABLE incidents ALTER COLUMN classification_status DROP DEFAULT"
+            ))
+            conn.execute(text(
+                "ALTER TABLE incidents ADD COLUMN IF NOT EXISTS "
+                "report_count INTEGER NOT NULL DEFAULT 1"
+            ))
+            conn.execute(text(
+                "ALTER TABLE notifications ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP"
+            ))
+            # Superseded by the partial ix_incidents_unclassified
+            conn.execute(text("DROP INDEX IF EXISTS ix_incidents_classification_status"))
+            
+            created = []
+            for table in Base.metadata.sorted_tables:
+                existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create(bind=conn)
+                        created.append(table.name)
+        
+        # New indexes need fresh statistics before the planner uses them;
+        # routine ANALYZE is left to autovacuum
+        for table_name in sorted(set(created)):
+            with self.engine.begin() as conn:
+                conn.execute(text(f"ANALYZE {table_name}"))
+    
+    def metrics(self) -> dict:
+        """Query latency, pool checkout wait and pool occupancy"""
+        return db_metrics.snapshot(self.engine)
+    
     def get_session(self) -> Session:
         db = self.SessionLocal()
         try:
@@ -117,13 +320,100 @@ class DatabaseService:
         """
         Create a new incident in the database.
         
+        The row (including AI fields when already classified) is written
+        with a single INSERT ... RETURNING in one transaction.
+        
         Args:
             db: SQLAlchemy session
-            incident_data: Dict with incident fields (from Pydantic model)
+            incident_data: Dict with incident fields (from Pydantic model),
+                optionally with AI fields when already classified
         
         Returns:
             Created IncidentDB object
         """
+        statement = insert(IncidentDB).values(**self._incident_values(incident_data)).returning(IncidentDB)
+        incident = db.scalars(statement).one()
+        db.commit()
+        self._notify_write("created", [incident_snapshot(incident)])
+        return incident
+    
+    def create_incidents_bulk(self, db: Session, incidents_data: List[dict]) -> List[IncidentDB]:
+        """
+        Insert many incidents in one transaction.
+        
+        Uses an executemany-style INSERT ... RETURNING, which SQLAlchemy
+        batches into multi-row VALUES statements. The returned incidents
+        are in the same order as incidents_data.
+        """
+        if not incidents_data:
+            return []
+        
+        rows = [self._incident_values(data) for data in incidents_data]
+        incidents = list(db.scalars(insert(IncidentDB).returning(IncidentDB, sort_by_parameter_order=True), rows))
+        db.commit()
+        self._notify_write("created", [incident_snapshot(incident) for incident in incidents])
+        return incidents
+    
+    def ingest_incidents(self, db: Session, rows: List[dict]) -> List[int]:
+        """
+        Bulk-load pre-validated rows for historical imports.
+        
+        Runs a Core executemany INSERT with the PostGIS point built
+        server-side from the row coordinates; rows are left pending for
+        the classification backfill. Each row needs title, description,
+        latitude, longitude, reporter_name, reporter_phone and created_at.
+        Returns the new ids in row order.
+        """
+        if not rows:
+            return []
+        
+        statement = (
+            insert(IncidentDB.__table__)
+            .values(
+                location=func.ST_SetSRID(
+                    func.ST_MakePoint(bindparam("point_lng", type_=Float), bindparam("point_lat", type_=Float)),
+                    4326
+                )
+            )
+            .returning(IncidentDB.id, sort_by_parameter_order=True)
+        )
+        # updated_at is the load time, not the historical created_at, so
+        # the trend rollup compactor picks these rows up
+        written_at = datetime.utcnow()
+        params = [
+            {
+                **row,
+                "point_lng": row["longitude"],
+                "point_lat": row["latitude"],
+                "updated_at": written_at,
+                "classification_status": "pending"
+            }
+            for row in rows
+        ]
+        ids = list(db.scalars(statement, params))
+        db.commit()
+        self._notify_write("created", [
+            {
+                "id": incident_id,
+                "title": row["title"],
+                "description": row["description"],
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "category": None,
+                "severity": None,
+                "ai_summary": None,
+                "classification_status": "pending",
+                "report_count": 1,
+                "reporter_name": row["reporter_name"],
+                "reporter_phone": row["reporter_phone"],
+                "created_at": row["created_at"],
+                "updated_at": written_at
+            }
+            for incident_id, row in zip(ids, rows)
+        ])
+        return ids
+    
+    def _incident_values(self, incident_data: dict) -> dict:
         from geoalchemy2.elements import WKTElement
         
         point = WKTElement(
@@ -131,20 +421,19 @@ class DatabaseService:
             srid=4326
         )
         
-        incident = IncidentDB(
-            title=incident_data['title'],
-            description=incident_data['description'],
-            latitude=incident_data['latitude'],
-            longitude=incident_data['longitude'],
-            location=point,
-            reporter_name=incident_data['reporter_name'],
-            reporter_phone=incident_data['reporter_phone'],
-        )
-        
-        db.add(incident)
-        db.commit()
-        db.refresh(incident)
-        return incident
+        return {
+            "title": incident_data['title'],
+            "description": incident_data['description'],
+            "latitude": incident_data['latitude'],
+            "longitude": incident_data['longitude'],
+            "location": point,
+            "reporter_name": incident_data['reporter_name'],
+            "reporter_phone": incident_data['reporter_phone'],
+            "category": incident_data.get('category'),
+            "severity": incident_data.get('severity'),
+            "ai_summary": incident_data.get('ai_summary'),
+            "classification_status": incident_data.get('classification_status', 'pending'),
+        }
     
     def get_incident_by_id(self, db: Session, incident_id: int) -> Optional[IncidentDB]:
         return db.query(IncidentDB).filter(IncidentDB.id == incident_id).first()
@@ -161,7 +450,56 @@ class DatabaseService:
         if category:
             query = query.filter(IncidentDB.category == category)
         
-        return query.order_by(IncidentDB.created_at.desc()).offset(skip).limit(limit).all()
+        # Same order as get_incidents_after, so offset pages and cursors agree
+        return query.order_by(IncidentDB.created_at.desc(), IncidentDB.id.desc()).offset(skip).limit(limit).all()
+    
+    def get_incidents_since(self, db: Session, since: datetime, limit: int) -> List[IncidentDB]:
+        """Incidents created at or after since, newest first"""
+        return (
+            db.query(IncidentDB)
+            .filter(IncidentDB.created_at >= since)
+            .order_by(IncidentDB.created_at.desc())
+            .limit(limit)
+            .all()
+        )
+    
+    def get_incidents_after(
+        self,
+        db: Session,
+        limit: int = 20,
+        category: Optional[str] = None,
+        cursor: Optional[tuple] = None
+    ) -> List[IncidentDB]:
+        """
+        Keyset page, newest first.
+        
+        cursor is the (created_at, id) of the last row of the previous page;
+        the row-value comparison lets Postgres seek straight to it on
+        ix_incidents_created_at_id, so deep pages cost the same as the first.
+        """
+        query = db.query(IncidentDB)
+        
+        if category:
+            query = query.filter(IncidentDB.category == category)
+        if cursor:
+            query = query.filter(tuple_(IncidentDB.created_at, IncidentDB.id) < tuple_(*cursor))
+        
+        return (
+            query.order_by(IncidentDB.created_at.desc(), IncidentDB.id.desc())
+            .limit(limit)
+            .all()
+        )
+    
+    def estimate_incidents(self, db: Session) -> Optional[int]:
+        """
+        Planner row estimate for the incidents table (no table scan).
+        
+        Returns None if the table has never been analyzed.
+        """
+        estimate = db.execute(text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = 'incidents'::regclass"
+        )).scalar()
+        return int(estimate) if estimate is not None and estimate >= 0 else None
     
     def count_incidents(self, db: Session, category: Optional[str] = None) -> int:
         """Count total incidents (for pagination)"""
@@ -170,25 +508,547 @@ class DatabaseService:
             query = query.filter(IncidentDB.category == category)
         return query.count()
     
+    def cluster_incidents_postgis(
+        self,
+        db: Session,
+        eps_km: float,
+        category: Optional[str] = None,
+        min_samples: int = 2,
+        max_ids: int = 100
+    ) -> dict:
+        """
+        DBSCAN inside PostGIS over every matching incident.
+        
+        Points are projected to POSTGIS_METRIC_SRID so eps is in metres,
+        clustered with ST_ClusterDBSCAN and aggregated per cluster, so only
+        one row per cluster leaves the database. Noise points form the
+        NULL group and only contribute to the total.
+        
+        Returns {"total_incidents": int, "clusters": [aggregate dicts]}.
+        """
+        severity_score = case(
+            *[(IncidentDB.severity == severity, score) for severity, score in SEVERITY_SCORES.items()],
+            else_=2
+        )
+        cluster_id = func.ST_ClusterDBSCAN(
+            func.ST_Transform(IncidentDB.location, settings.POSTGIS_METRIC_SRID),
+            eps_km * 1000,
+            min_samples
+        ).over()
+        
+        labelled = select(
+            IncidentDB.id,
+            IncidentDB.latitude,
+            IncidentDB.longitude,
+            IncidentDB.category,
+            severity_score.label("severity_score"),
+            cluster_id.label("cluster_id")
+        )
+        if category:
+            labelled = labelled.where(IncidentDB.category == category)
+        labelled = labelled.subquery()
+        
+        statement = (
+            select(
+                labelled.c.cluster_id,
+                func.count().label("incident_count"),
+                func.avg(labelled.c.latitude).label("center_lat"),
+                func.avg(labelled.c.longitude).label("center_lng"),
+                func.avg(labelled.c.severity_score).label("severity_score"),
+                func.mode().within_group(labelled.c.category).label("dominant_category"),
+                func.array_agg(labelled.c.id)[1:max_ids].label("incident_ids")
+            )
+            .group_by(labelled.c.cluster_id)
+        )
+        
+        total = 0
+        clusters = []
+        for row in db.execute(statement):
+            total += row.incident_count
+            if row.cluster_id is None:
+                continue
+            clusters.append({
+                "cluster_id": row.cluster_id,
+                "incident_count": row.incident_count,
+                "center_lat": float(row.center_lat),
+                "center_lng": float(row.center_lng),
+                "severity_score": float(row.severity_score),
+                "dominant_category": row.dominant_category.value if row.dominant_category else "other",
+                "incident_ids": list(row.incident_ids or [])
+            })
+        
+        return {"total_incidents": total, "clusters": clusters}
+    
+    def heatmap_bins_postgis(
+        self,
+        db: Session,
+        pixel_zoom: int,
+        bbox: tuple,
+        category: Optional[str] = None
+    ) -> List[tuple]:
+        """
+        Severity-weighted incident counts per Web Mercator pixel.
+        
+        bbox is (min_lng, min_lat, max_lng, max_lat); pixels are the XYZ
+        tile grid at pixel_zoom, so one row per non-empty pixel leaves the
+        database. Weights are severity score / 4 (low 0.25 ... critical 1.0).
+        
+        Returns [(px, py, incident_count, weight)].
+        """
+        px, py = self._pixel_columns(pixel_zoom)
+        weight = case(
+            *[(IncidentDB.severity == severity, score / 4.0) for severity, score in SEVERITY_SCORES.items()],
+            else_=0.5
+        )
+        
+        statement = (
+            select(
+                px.label("px"),
+                py.label("py"),
+                func.count().label("incident_count"),
+                func.sum(weight).label("weight")
+            )
+            .where(IncidentDB.location.op("&&")(func.ST_MakeEnvelope(*bbox, 4326)))
+            .group_by("px", "py")
+        )
+        if category:
+            statement = statement.where(IncidentDB.category == category)
+        
+        return [
+            (int(row.px), int(row.py), row.incident_count, float(row.weight))
+            for row in db.execute(statement)
+        ]
+    
+    def incident_bins(self, db: Session, pixel_zoom: int) -> List[tuple]:
+        """
+        Incident counts per (category, severity, Web Mercator pixel) over the
+        whole table, for rebuilding in-memory analytics. Plain SQL math, so
+        it does not need PostGIS.
+        
+        Returns [(category, severity, px, py, incident_count)] with enums as values.
+        """
+        px, py = self._pixel_columns(pixel_zoom)
+        statement = (
+            select(
+                IncidentDB.category,
+                IncidentDB.severity,
+                px.label("px"),
+                py.label("py"),
+                func.count().label("incident_count")
+            )
+            .group_by(IncidentDB.category, IncidentDB.severity, "px", "py")
+        )
+        return [
+            (
+                row.category.value if row.category else None,
+                row.severity.value if row.severity else None,
+                int(row.px),
+                int(row.py),
+                row.incident_count
+            )
+            for row in db.execute(statement)
+        ]
+    
+    def _pixel_columns(self, pixel_zoom: int) -> tuple:
+        """XYZ pixel x/y expressions for the incident coordinates at pixel_zoom"""
+        scale = float(2 ** pixel_zoom)
+        lat_radians = func.radians(IncidentDB.latitude, type_=Float)
+        mercator_y = func.ln(func.tan(lat_radians, type_=Float) + 1.0 / func.cos(lat_radians, type_=Float), type_=Float)
+        px = func.floor((IncidentDB.longitude + 180.0) / 360.0 * scale)
+        py = func.floor((1.0 - mercator_y / func.pi(type_=Float)) / 2.0 * scale)
+        return px, py
+    
+    def compact_incident_rollups(self, db: Session, until: datetime, cell_zoom: int) -> dict:
+        """
+        Fold incidents written since the last compaction into incident_rollups.
+        
+        Every hour (of created_at) that has an incident with updated_at in
+        (watermark, until] is recounted from scratch, so inserts,
+        reclassifications and report_count bumps are all picked up without
+        keeping per-incident history. The rollup_state row is locked for the
+        whole transaction, so concurrent compactors (other workers) take
+        turns. Changing cell_zoom, or the first run, recounts every hour.
+        """
+        db.execute(
+            pg_insert(RollupStateDB)
+            .values(name="incidents", cell_zoom=cell_zoom, watermark=None)
+            .on_conflict_do_nothing(index_elements=["name"])
+        )
+        state = db.execute(
+            select(RollupStateDB.cell_zoom, RollupStateDB.watermark)
+            .where(RollupStateDB.name == "incidents")
+            .with_for_update()
+        ).one()
+        
+        since = state.watermark if state.cell_zoom == cell_zoom else None
+        if since is not None and since >= until:
+            db.rollback()
+            return {"hours": 0, "rows": 0, "watermark": since}
+        
+        hour = func.date_trunc("hour", IncidentDB.created_at)
+        changed = select(hour.label("hour")).where(IncidentDB.updated_at <= until).distinct()
+        if since is not None:
+            changed = changed.where(IncidentDB.updated_at > since)
+        hours = sorted(db.scalars(changed))
+        
+        rows = []
+        if hours:
+            cell_x, cell_y = self._pixel_columns(cell_zoom)
+            counts = (
+                select(
+                    hour.label("hour"),
+                    IncidentDB.category,
+                    IncidentDB.severity,
+                    cell_x.label("cell_x"),
+                    cell_y.label("cell_y"),
+                    func.count().label("incident_count"),
+                    func.sum(IncidentDB.report_count).label("report_count")
+                )
+                .group_by("hour", IncidentDB.category, IncidentDB.severity, "cell_x", "cell_y")
+            )
+            if since is not None:
+                counts = counts.where(
+                    IncidentDB.created_at >= hours[0],
+                    IncidentDB.created_at < hours[-1] + timedelta(hours=1),
+                    hour.in_(hours)
+                )
+                db.execute(IncidentRollupDB.__table__.delete().where(IncidentRollupDB.hour.in_(hours)))
+            else:
+                db.execute(IncidentRollupDB.__table__.delete())
+            
+            rows = [
+                {
+                    "hour": row.hour,
+                    "category": row.category.value if row.category else "unclassified",
+                    "severity": row.severity.value if row.severity else "unclassified",
+                    "cell_x": int(row.cell_x),
+                    "cell_y": int(row.cell_y),
+                    "incident_count": row.incident_count,
+                    "report_count": int(row.report_count)
+                }
+                for row in db.execute(counts)
+            ]
+            if rows:
+                db.execute(insert(IncidentRollupDB), rows)
+        
+        db.execute(
+            update(RollupStateDB)
+            .where(RollupStateDB.name == "incidents")
+            .values(cell_zoom=cell_zoom, watermark=until)
+        )
+        db.commit()
+        return {"hours": len(hours), "rows": len(rows), "watermark": until}
+    
+    def incident_trends(
+        self,
+        db: Session,
+        bucket: str,
+        since: datetime,
+        until: datetime,
+        group_by: Optional[str] = None,
+        category: Optional[str] = None,
+        severity: Optional[str] = None,
+        cells: Optional[tuple] = None
+    ) -> List[tuple]:
+        """
+        Incident and report counts per time bucket from incident_rollups.
+        
+        bucket is a date_trunc unit (hour, day, week); group_by is None,
+        "category" or "severity"; cells is (x0, y0, x1, y1) in rollup
+        cell coordinates. Reads only rollup rows in the time range.
+        
+        Returns [(bucket_start, group, incident_count, report_count)] ordered by bucket.
+        """
+        bucket_start = func.date_trunc(bucket, IncidentRollupDB.hour).label("bucket")
+        keys = [bucket_start]
+        if group_by:
+            keys.append(getattr(IncidentRollupDB, group_by).label("group_key"))
+        
+        statement = (
+            select(
+                *keys,
+                func.sum(IncidentRollupDB.incident_count).label("incident_count"),
+                func.sum(IncidentRollupDB.report_count).label("report_count")
+            )
+            .where(IncidentRollupDB.hour >= since, IncidentRollupDB.hour < until)
+            .group_by(*[key.name for key in keys])
+            .order_by(*[key.name for key in keys])
+        )
+        if category:
+            statement = statement.where(IncidentRollupDB.category == category)
+        if severity:
+            statement = statement.where(IncidentRollupDB.severity == severity)
+        if cells:
+            x0, y0, x1, y1 = cells
+            statement = statement.where(
+                IncidentRollupDB.cell_x.between(x0, x1),
+                IncidentRollupDB.cell_y.between(y0, y1)
+            )
+        
+        return [
+            (row.bucket, row.group_key if group_by else None, int(row.incident_count), int(row.report_count))
+            for row in db.execute(statement)
+        ]
+    
+    def get_pending_incidents(
+        self,
+        db: Session,
+        limit: int = 100,
+        after_id: int = 0,
+        statuses: tuple = ("pending",)
+    ) -> List[IncidentDB]:
+        """Incidents still waiting for AI classification, walked in id order"""
+        return (
+            db.query(IncidentDB)
+            .filter(IncidentDB.classification_status.in_(statuses))
+            .filter(IncidentDB.id > after_id)
+            .order_by(IncidentDB.id.asc())
+            .limit(limit)
+            .all()
+        )
+    
     def update_incident_ai_fields(
         self,
         db: Session,
         incident_id: int,
         category: str,
         severity: str,
-        ai_summary: str
+        ai_summary: str,
+        classification_status: str = "completed"
     ) -> Optional[IncidentDB]:
-        incident = self.get_incident_by_id(db, incident_id)
-        if incident:
-            incident.category = category
-            incident.severity = severity
-            incident.ai_summary = ai_summary
-            incident.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(incident)
+        """
+        UPDATE ... RETURNING the classified row.
+        
+        The previous category/severity are read under a row lock in the
+        same transaction so write listeners can adjust running totals.
+        """
+        previous = db.execute(
+            select(IncidentDB.category, IncidentDB.severity)
+            .where(IncidentDB.id == incident_id)
+            .with_for_update()
+        ).one_or_none()
+        if previous is None:
+            db.rollback()
+            return None
+        
+        statement = (
+            update(IncidentDB)
+            .where(IncidentDB.id == incident_id)
+            .values(
+                category=category,
+                severity=severity,
+                ai_summary=ai_summary,
+                classification_status=classification_status,
+                updated_at=datetime.utcnow()
+            )
+            .returning(IncidentDB)
+            .execution_options(synchronize_session=False)
+        )
+        incident = db.scalars(statement).one_or_none()
+        db.commit()
+        
+        if incident is not None:
+            snapshot = incident_snapshot(incident)
+            snapshot["previous"] = {
+                "category": previous.category.value if previous.category else None,
+                "severity": previous.severity.value if previous.severity else None
+            }
+            self._notify_write("updated", [snapshot])
         return incident
     
     
+    def attach_duplicate_report(
+        self,
+        db: Session,
+        incident_id: int,
+        report_data: dict,
+        similarity: float,
+        distance_m: float
+    ) -> Optional[IncidentDB]:
+        """
+        Record report_data as another report of incident_id.
+        
+        Inserts the duplicate_reports row and bumps report_count in one
+        transaction; returns the updated incident, or None if it no longer
+        exists (the caller then stores the report as a new incident).
+        """
+        statement = (
+            update(IncidentDB)
+            .where(IncidentDB.id == incident_id)
+            .values(report_count=IncidentDB.report_count + 1, updated_at=datetime.utcnow())
+            .returning(IncidentDB)
+            .execution_options(synchronize_session=False)
+        )
+        incident = db.scalars(statement).one_or_none()
+        if incident is None:
+            db.rollback()
+            return None
+        
+        db.execute(insert(DuplicateReportDB).values(
+            incident_id=incident_id,
+            title=report_data["title"],
+            description=report_data["description"],
+            latitude=report_data["latitude"],
+            longitude=report_data["longitude"],
+            reporter_name=report_data["reporter_name"],
+            reporter_phone=report_data["reporter_phone"],
+            similarity=similarity,
+            distance_m=distance_m
+        ))
+        db.commit()
+        
+        snapshot = incident_snapshot(incident)
+        snapshot["previous"] = {"category": snapshot["category"], "severity": snapshot["severity"]}
+        self._notify_write("updated", [snapshot])
+        return incident
+    
+    def get_duplicate_reports(self, db: Session, incident_id: int) -> List[DuplicateReportDB]:
+        return (
+            db.query(DuplicateReportDB)
+            .filter(DuplicateReportDB.incident_id == incident_id)
+            .order_by(DuplicateReportDB.id)
+            .all()
+        )
+    
+    def get_cached_classification(self, cache_key: str, max_age_seconds: int) -> Optional[dict]:
+        db = self.SessionLocal()
+        try:
+            row = (
+                db.query(ClassificationCacheDB)
+                .filter(ClassificationCacheDB.cache_key == cache_key)
+                .filter(ClassificationCacheDB.created_at >= datetime.utcnow() - timedelta(seconds=max_age_seconds))
+                .first()
+            )
+            if row is None:
+                return None
+            return {
+                "category": row.category,
+                "severity": row.severity,
+                "ai_summary": row.ai_summary
+            }
+        finally:
+            db.close()
+    
+    def store_cached_classification(self, cache_key: str, result: dict, model: str):
+        from sqlalchemy.dialects.postgresql import insert
+        
+        values = {
+            "cache_key": cache_key,
+            "category": result["category"],
+            "severity": result["severity"],
+            "ai_summary": result["ai_summary"],
+            "model": model,
+            "created_at": datetime.utcnow()
+        }
+        statement = insert(ClassificationCacheDB).values(**values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ClassificationCacheDB.cache_key],
+            set_={key: statement.excluded[key] for key in values if key != "cache_key"}
+        )
+        
+        db = self.SessionLocal()
+        try:
+            db.execute(statement)
+            db.commit()
+        finally:
+            db.close()
+    
+    def create_notifications(self, rows: List[dict]) -> List[int]:
+        """Insert queued delivery records; returns their ids in order"""
+        if not rows:
+            return []
+        
+        db = self.SessionLocal()
+        try:
+            ids = list(db.scalars(
+                insert(NotificationDB).returning(NotificationDB.id, sort_by_parameter_order=True), rows
+            ))
+            db.commit()
+            return ids
+        finally:
+            db.close()
+    
+    def update_notification(
+        self,
+        notification_id: int,
+        status: str,
+        attempts: int,
+        last_error: Optional[str] = None
+    ):
+        values = {"status": status, "attempts": attempts, "last_error": last_error}
+        if status == "sent":
+            values["sent_at"] = datetime.utcnow()
+        
+        db = self.SessionLocal()
+        try:
+            db.execute(update(NotificationDB).where(NotificationDB.id == notification_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+    
+    def claim_queued_notifications(self, older_than: datetime, expire_before: datetime) -> List[tuple]:
+        """
+        Take over deliveries left unfinished by a stopped process.
+        
+        Rows still "queued" or "retrying" that were created before
+        expire_before are marked failed. Rows queued before older_than
+        (long enough ago that no live process is still sending them), and
+        "retrying" rows whose claim is older than that (the process that
+        claimed them stopped too), are switched to "retrying" with a fresh
+        claimed_at in one UPDATE ... RETURNING, so each is claimed by a
+        single process. Returns [(notification dict, incident snapshot)].
+        """
+        db = self.SessionLocal()
+        try:
+            db.execute(
+                update(NotificationDB)
+                .where(
+                    NotificationDB.status.in_(("queued", "retrying")),
+                    NotificationDB.created_at < expire_before
+                )
+                .values(status="failed", last_error="Expired: not delivered before restart")
+            )
+            claimed = db.execute(
+                update(NotificationDB)
+                .where(or_(
+                    and_(NotificationDB.status == "queued", NotificationDB.created_at < older_than),
+                    and_(
+                        NotificationDB.status == "retrying",
+                        # Rows claimed before claimed_at existed have none
+                        func.coalesce(NotificationDB.claimed_at, NotificationDB.created_at) < older_than
+                    )
+                ))
+                .values(status="retrying", claimed_at=datetime.utcnow())
+                .returning(
+                    NotificationDB.id,
+                    NotificationDB.incident_id,
+                    NotificationDB.kind,
+                    NotificationDB.recipient,
+                    NotificationDB.phone,
+                    NotificationDB.created_at
+                )
+            ).mappings().all()
+            
+            incidents = {}
+            if claimed:
+                incident_ids = {row["incident_id"] for row in claimed}
+                incidents = {
+                    incident.id: incident_snapshot(incident)
+                    for incident in db.query(IncidentDB).filter(IncidentDB.id.in_(incident_ids))
+                }
+            db.commit()
+            return [(dict(row), incidents[row["incident_id"]]) for row in claimed if row["incident_id"] in incidents]
+        finally:
+            db.close()
+    
+    def get_notifications(self, db: Session, incident_id: int) -> List[NotificationDB]:
+        return (
+            db.query(NotificationDB)
+            .filter(NotificationDB.incident_id == incident_id)
+            .order_by(NotificationDB.id)
+            .all()
+        )
+    
     async def create_user(
         self,
         name: str,
@@ -196,6 +1056,33 @@ class DatabaseService:
         password_hash: str,
         email: Optional[str],
         emergency_contacts: List[dict]
+    ) -> UserDB:
+        return await run_in_threadpool(
+            self._create_user, name, phone, password_hash, email, emergency_contacts
+        )
+    
+    async def get_user_by_phone(self, phone: str) -> Optional[UserDB]:
+        return await run_in_threadpool(self._get_user_by_phone, phone)
+    
+    async def get_user_by_id(self, user_id: int) -> Optional[UserDB]:
+        return await run_in_threadpool(self._get_user_by_id, user_id)
+    
+    async def update_password_hash(self, user_id: int, password_hash: str):
+        await run_in_threadpool(self._update_password_hash, user_id, password_hash)
+    
+    async def update_user(self, user_id: int, fields: dict) -> Optional[UserDB]:
+        return await run_in_threadpool(self._update_user, user_id, fields)
+    
+    # The async user methods above run these on the threadpool so the
+    # blocking session never stalls the event loop.
+    
+    def _create_user(
+        self,
+        name: str,
+        phone: str,
+        password_hash: str,
+        email: Optional[str],
+        emergency_contacts: List[dict]
     ) -> UserDB:
         db = self.SessionLocal()
         try:
@@ -213,19 +1100,40 @@ class DatabaseService:
         finally:
             db.close()
     
-    async def get_user_by_phone(self, phone: str) -> Optional[UserDB]:
+    def _get_user_by_phone(self, phone: str) -> Optional[UserDB]:
         db = self.SessionLocal()
         try:
             return db.query(UserDB).filter(UserDB.phone == phone).first()
         finally:
             db.close()
     
-    async def get_user_by_id(self, user_id: int) -> Optional[UserDB]:
+    def _get_user_by_id(self, user_id: int) -> Optional[UserDB]:
         db = self.SessionLocal()
         try:
             return db.query(UserDB).filter(UserDB.id == user_id).first()
         finally:
             db.close()
+    
+    def _update_user(self, user_id: int, fields: dict) -> Optional[UserDB]:
+        """Update profile columns (name, email, emergency_contacts) and return the row"""
+        db = self.SessionLocal()
+        try:
+            user = db.scalars(
+                update(UserDB).where(UserDB.id == user_id).values(**fields).returning(UserDB)
+                .execution_options(synchronize_session=False)
+            ).one_or_none()
+            db.commit()
+            return user
+        finally:
+            db.close()
+    
+    def _update_password_hash(self, user_id: int, password_hash: str):
+        db = self.SessionLocal()
+        try:
+            db.execute(update(UserDB).where(UserDB.id == user_id).values(password_hash=password_hash))
+            db.commit()
+        finally:
+            db.close()
 
 
 db_service = DatabaseService()
@@ -0,0 +1,126 @@
+"""
+Duplicate report detection for incoming incidents.
+
+During an incident storm many people report the same event within a few
+hundred metres and minutes. Before a report is stored, the recent
+incident index (GeoService.recent_incidents) is searched for incidents
+within DEDUP_RADIUS_M created in the last DEDUP_WINDOW_MINUTES, and the
+report's text is compared with each of them. The best match at or above
+DEDUP_SIMILARITY_THRESHOLD is returned so the report can be attached to
+it instead of becoming a new incident.
+
+Similarity is the Dice coefficient of the two reports' word sets (title
+and description, lowercased, stop words and very short words removed,
+plural "s" stripped), so it is cheap enough to run on every report.
+"""
+import re
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+from config import settings
+from .geo_service import geo_service, GeoService
+
+
+STOP_WORDS = frozenset("""
+    a an and are at be been but by for from has have in is it its near
+    of on or our the there this to was were with who will my me we
+    they them their his her he she you your please help just now very
+    some someone people area road street
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class DuplicateMatch:
+    incident_id: int
+    similarity: float
+    distance_m: float
+
+
+def report_terms(title: str, description: str) -> FrozenSet[str]:
+    terms = set()
+    for word in _WORD.findall(f"{title} {description}".lower()):
+        if len(word) < 3 or word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class DuplicateDetector:
+
+    def __init__(
+        self,
+        geo: GeoService,
+        enabled: bool = settings.DEDUP_ENABLED,
+        radius_m: float = settings.DEDUP_RADIUS_M,
+        window_minutes: float = settings.DEDUP_WINDOW_MINUTES,
+        threshold: float = settings.DEDUP_SIMILARITY_THRESHOLD
+    ):
+        self.geo = geo
+        self.enabled = enabled
+        self.radius_m = radius_m
+        self.window_minutes = window_minutes
+        self.threshold = threshold
+
+        self.checked = 0
+        self.duplicates = 0
+
+    def find_duplicate(self, report: dict) -> Optional[DuplicateMatch]:
+        """
+        Best-matching recent incident for report, or None.
+
+        report carries title, description, latitude, longitude and, when
+        the fast classifier already ran, category. Incidents classified
+        into a different category are never matched.
+        """
+        if not self.enabled:
+            return None
+        self.checked += 1
+
+        candidates = self.geo.recent_incidents.nearby(
+            report["latitude"],
+            report["longitude"],
+            self.radius_m / 1000,
+            self.window_minutes / 60
+        )
+        if not candidates:
+            return None
+
+        terms = report_terms(report["title"], report["description"])
+        category = report.get("category")
+        category = getattr(category, "value", category)
+
+        best = None
+        for incident, distance_km in candidates:
+            if category and incident["category"] and incident["category"] != category:
+                continue
+            score = similarity(terms, report_terms(incident["title"], incident["description"]))
+            if score < self.threshold:
+                continue
+            if best is None or score > best.similarity:
+                best = DuplicateMatch(incident["id"], round(score, 3), round(distance_km * 1000, 1))
+
+        return best
+
+    def record_attached(self):
+        """Count a match that was actually attached (the incident may have gone)."""
+        self.duplicates += 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "checked": self.checked,
+            "duplicates": self.duplicates
+        }
+
+
+duplicate_detector = DuplicateDetector(geo_service)
@@ -1,4 +1,5 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+from datetime import datetime
 import json
 from pathlib import Path
 from math import radians, cos, sin, asin, sqrt
@@ -6,14 +7,43 @@ from math import radians, cos, sin, asin, sqrt
 from sklearn.cluster import DBSCAN
 import numpy as np
 
+from config import settings
+from .spatial_index import LandmarkIndex, RecentIncidentIndex
+from .db_service import db_service, DatabaseService, incident_snapshot
+
+
+EARTH_RADIUS_KM = 6371.0
+
+SEVERITY_SCORES = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
+
+# Response key -> landmark type for get_spatial_context()
+SPATIAL_CONTEXT_FIELDS = [
+    ("nearest_police_station", "police_stations"),
+    ("nearest_hospital", "hospitals"),
+    ("nearby_landmark", "landmarks")
+]
+
 
 class GeoService:
     
-    def __init__(self):
-        landmarks_path = Path(__file__).parent.parent / "data" / "patiala_landmarks.json"
+    def __init__(self, database: Optional[DatabaseService] = None):
+        landmarks_path = Path(settings.LANDMARKS_FILE) if settings.LANDMARKS_FILE else \
+            Path(__file__).parent.parent / "data" / "patiala_landmarks.json"
         
         with open(landmarks_path, 'r', encoding='utf-8') as f:
             self.landmarks_data = json.load(f)
+        
+        self.landmark_index = LandmarkIndex(self.landmarks_data)
+        
+        # Recent incidents for proximity queries, kept current by the create path
+        self.database = database
+        self.recent_incidents = RecentIncidentIndex(
+            window_hours=settings.RECENT_INCIDENTS_WINDOW_HOURS,
+            cell_km=settings.RECENT_INCIDENTS_CELL_KM,
+            max_incidents=settings.RECENT_INCIDENTS_MAX
+        )
+        if database is not None:
+            database.add_write_listener(self.recent_incidents.on_write)
     
     def haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
      
@@ -25,87 +55,250 @@ class GeoService:
         km = 6371 * c
         return round(km, 2)
     
-    def find_nearest_landmark(self, lat: float, lng: float, landmark_type: str = "police_stations") -> Dict:
-
-        landmarks = self.landmarks_data.get(landmark_type, [])
-        
-        if not landmarks:
+    def _format_landmark(self, landmark: Dict, distance_km: float) -> Dict:
+        result = {
+            "name": landmark['name'],
+            "distance_km": round(distance_km, 2),
+            "coordinates": {"lat": landmark['lat'], "lng": landmark['lng']}
+        }
+        if 'phone' in landmark:
+            result['phone'] = landmark['phone']
+        if 'emergency' in landmark:
+            result['emergency'] = landmark['emergency']
+        return result
+    
+    def find_nearest_landmark(self, lat: float, lng: float, landmark_type: str = "police_stations") -> Optional[Dict]:
+        nearest = self.landmark_index.nearest(lat, lng, landmark_type, k=1)
+        if not nearest:
             return None
         
-        nearest = None
-        min_distance = float('inf')
-        
-        for landmark in landmarks:
-            distance = self.haversine_distance(
-                lat, lng,
-                landmark['lat'], landmark['lng']
-            )
-            
-            if distance < min_distance:
-                min_distance = distance
-                nearest = {
-                    "name": landmark['name'],
-                    "distance_km": distance,
-                    "coordinates": {"lat": landmark['lat'], "lng": landmark['lng']}
-                }
-                if 'phone' in landmark:
-                    nearest['phone'] = landmark['phone']
-                if 'emergency' in landmark:
-                    nearest['emergency'] = landmark['emergency']
-        
-        return nearest
+        landmark, distance_km = nearest[0]
+        return self._format_landmark(landmark, distance_km)
+    
+    def find_nearest_landmarks(self, lat: float, lng: float, landmark_type: str = "police_stations", k: int = 5) -> List[Dict]:
+        """Up to k landmarks of one type, closest first"""
+        return [
+            self._format_landmark(landmark, distance_km)
+            for landmark, distance_km in self.landmark_index.nearest(lat, lng, landmark_type, k=k)
+        ]
+    
+    def find_landmarks_within(self, lat: float, lng: float, radius_km: float, landmark_type: str = "police_stations") -> List[Dict]:
+        """All landmarks of one type within radius_km, closest first"""
+        return [
+            self._format_landmark(landmark, distance_km)
+            for landmark, distance_km in self.landmark_index.within(lat, lng, radius_km, landmark_type)
+        ]
     
     def get_spatial_context(self, lat: float, lng: float) -> Dict:
         return {
-            "nearest_police_station": self.find_nearest_landmark(lat, lng, "police_stations"),
-            "nearest_hospital": self.find_nearest_landmark(lat, lng, "hospitals"),
-            "nearby_landmark": self.find_nearest_landmark(lat, lng, "landmarks")
+            key: self.find_nearest_landmark(lat, lng, landmark_type)
+            for key, landmark_type in SPATIAL_CONTEXT_FIELDS
         }
     
+    def get_spatial_context_batch(self, points: List[Dict]) -> List[Dict]:
+        """
+        get_spatial_context() for many {"lat", "lng"} points, in input order.
+        
+        Each landmark type is resolved with a single tree query over all
+        points rather than one lookup per point.
+        """
+        if not points:
+            return []
+        
+        lats = np.array([point['lat'] for point in points], dtype=float)
+        lngs = np.array([point['lng'] for point in points], dtype=float)
+        
+        contexts = [{} for _ in points]
+        for key, landmark_type in SPATIAL_CONTEXT_FIELDS:
+            nearest = self.landmark_index.nearest_batch(lats, lngs, landmark_type)
+            if nearest is None:
+                for context in contexts:
+                    context[key] = None
+                continue
+            
+            indices, distances_km = nearest
+            for context, index, distance_km in zip(contexts, indices.tolist(), distances_km.tolist()):
+                context[key] = self._format_landmark(
+                    self.landmark_index.get(landmark_type, index), distance_km
+                )
+        
+        return contexts
+    
+    def load_recent_incidents(self) -> int:
+        """Fill the recent incident index from the database; returns the number loaded"""
+        db = self.database.SessionLocal()
+        try:
+            incidents = self.database.get_incidents_since(
+                db,
+                datetime.utcnow() - self.recent_incidents.window,
+                limit=self.recent_incidents.max_incidents
+            )
+            snapshots = [incident_snapshot(incident) for incident in incidents]
+        finally:
+            db.close()
+        
+        self.recent_incidents.load(snapshots)
+        return len(snapshots)
+    
+    def find_recent_incidents(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        hours: float,
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """Incidents within radius_km created in the last hours, closest first"""
+        return [
+            {**incident, "distance_m": round(distance_km * 1000)}
+            for incident, distance_km in self.recent_incidents.nearby(lat, lng, radius_km, hours, category, limit)
+        ]
+    
     def cluster_incidents(self, incidents: List[Dict], eps_km: float = 0.5) -> List[Dict]:
         if len(incidents) < 2:
             return []
         
-        coords = np.array([[inc['latitude'], inc['longitude']] for inc in incidents])
+        labels = self._cluster_labels(incidents, eps_km)
+        aggregates = self._aggregate_clusters(incidents, labels)
         
-        eps_degrees = eps_km / 111.0  
-        clustering = DBSCAN(eps=eps_degrees, min_samples=2).fit(coords)
+        return self.summarize_clusters(aggregates, eps_km)
+    
+    def _cluster_labels(self, incidents: List[Dict], eps_km: float, min_samples: int = 2) -> np.ndarray:
+        """
+        DBSCAN labels (-1 = noise) using great-circle distance.
         
-        clusters = {}
-        for idx, label in enumerate(clustering.labels_):
-            if label == -1:  
-                continue
-            
-            if label not in clusters:
-                clusters[label] = []
-            
-            clusters[label].append(incidents[idx])
+        Coordinates are converted to radians and clustered with the
+        haversine metric on a BallTree, so eps is a true radius in km
+        instead of a degree box that stretches with longitude. Identical
+        coordinates are collapsed into one weighted sample first.
+        """
+        coords = np.radians(np.array(
+            [[inc['latitude'], inc['longitude']] for inc in incidents],
+            dtype=float
+        ))
+        
+        # Reports from the same spot are clustered once, weighted by count
+        unique_coords, inverse, counts = np.unique(
+            coords, axis=0, return_inverse=True, return_counts=True
+        )
+        
+        clustering = DBSCAN(
+            eps=eps_km / EARTH_RADIUS_KM,
+            min_samples=min_samples,
+            metric='haversine',
+            algorithm='ball_tree'
+        ).fit(unique_coords, sample_weight=counts)
+        
+        return clustering.labels_[inverse.reshape(-1)]
+    
+    def _aggregate_clusters(self, incidents: List[Dict], labels: np.ndarray) -> List[Dict]:
+        """
+        Per-cluster count, centroid, mean severity, dominant category and
+        member ids, computed with bincount over the labels.
+        """
+        clustered = np.flatnonzero(labels >= 0)
+        if clustered.size == 0:
+            return []
+        
+        cluster_labels = labels[clustered]
+        n_clusters = int(cluster_labels.max()) + 1
+        
+        lats = np.array([incidents[i]['latitude'] for i in clustered], dtype=float)
+        lngs = np.array([incidents[i]['longitude'] for i in clustered], dtype=float)
+        severities = np.array(
+            [SEVERITY_SCORES.get(incidents[i].get('severity', 'medium'), 2) for i in clustered],
+            dtype=float
+        )
+        category_names, category_codes = np.unique(
+            np.array([incidents[i].get('category') or 'other' for i in clustered]),
+            return_inverse=True
+        )
+        
+        counts = np.bincount(cluster_labels, minlength=n_clusters)
+        center_lats = np.bincount(cluster_labels, weights=lats, minlength=n_clusters) / counts
+        center_lngs = np.bincount(cluster_labels, weights=lngs, minlength=n_clusters) / counts
+        severity_scores = np.bincount(cluster_labels, weights=severities, minlength=n_clusters) / counts
+        
+        category_counts = np.bincount(
+            cluster_labels * len(category_names) + category_codes,
+            minlength=n_clusters * len(category_names)
+        ).reshape(n_clusters, len(category_names))
+        dominant = category_names[category_counts.argmax(axis=1)]
+        
+        # Member positions grouped by cluster label
+        order = np.argsort(cluster_labels, kind='stable')
+        members = np.split(clustered[order], np.cumsum(counts)[:-1])
+        
+        return [
+            {
+                "cluster_id": label,
+                "incident_count": int(counts[label]),
+                "center_lat": float(center_lats[label]),
+                "center_lng": float(center_lngs[label]),
+                "severity_score": float(severity_scores[label]),
+                "dominant_category": str(dominant[label]),
+                "incident_ids": [incidents[i]['id'] for i in members[label] if 'id' in incidents[i]]
+            }
+            for label in range(n_clusters)
+            if counts[label]
+        ]
+    
+    def summarize_clusters(self, aggregates: List[Dict], eps_km: float) -> List[Dict]:
+        """
+        Shape per-cluster aggregates (e.g. from PostGIS) like cluster_incidents().
+        """
+        if not aggregates:
+            return []
+        
+        # One tree query for every cluster center
+        center_lats = np.array([cluster['center_lat'] for cluster in aggregates], dtype=float)
+        center_lngs = np.array([cluster['center_lng'] for cluster in aggregates], dtype=float)
+        nearest = self.landmark_index.nearest_batch(center_lats, center_lngs, "police_stations")
         
         cluster_summaries = []
-        for label, cluster_incidents in clusters.items():
-            lats = [inc['latitude'] for inc in cluster_incidents]
-            lngs = [inc['longitude'] for inc in cluster_incidents]
-            center_lat = sum(lats) / len(lats)
-            center_lng = sum(lngs) / len(lngs)
-            
-            severity_map = {'low': 1, 'medium': 2, 'high': 3, 'critical': 4}
-            severities = [severity_map.get(inc.get('severity', 'medium'), 2) for inc in cluster_incidents]
-            avg_severity = sum(severities) / len(severities)
+        for i, cluster in enumerate(aggregates):
+            center_lat = cluster['center_lat']
+            center_lng = cluster['center_lng']
             
-            nearest_police = self.find_nearest_landmark(center_lat, center_lng, "police_stations")
+            police_station = None
+            if nearest is not None:
+                indices, distances_km = nearest
+                police_station = self._format_landmark(
+                    self.landmark_index.get("police_stations", int(indices[i])),
+                    float(distances_km[i])
+                )
             
             cluster_summaries.append({
-                "cluster_id": int(label),
+                "cluster_id": int(cluster['cluster_id']),
                 "center": {"lat": round(center_lat, 4), "lng": round(center_lng, 4)},
-                "incident_count": len(cluster_incidents),
-                "severity_score": round(avg_severity, 2),
+                "incident_count": cluster['incident_count'],
+                "severity_score": round(cluster['severity_score'], 2),
                 "radius_km": eps_km,
-                "nearest_police_station": nearest_police,
-                "incident_ids": [inc.get('id') for inc in cluster_incidents if 'id' in inc]
+                "dominant_category": cluster['dominant_category'],
+                "nearest_police_station": police_station,
+                "incident_ids": cluster['incident_ids']
             })
         
         return sorted(cluster_summaries, key=lambda x: x['severity_score'], reverse=True)
     
+    def danger_zones_from_clusters(self, clusters: List[Dict], threshold: int = 3) -> List[Dict]:
+        """Danger zones from summarize_clusters() output"""
+        return [
+            {
+                "zone_id": cluster['cluster_id'],
+                "center": cluster['center'],
+                "radius_km": cluster['radius_km'],
+                "incident_count": cluster['incident_count'],
+                "severity_score": cluster['severity_score'],
+                "dominant_category": cluster['dominant_category'],
+                "nearest_police_station": cluster['nearest_police_station'],
+                "risk_level": "high" if cluster['severity_score'] >= 3 else "medium"
+            }
+            for cluster in clusters
+            if cluster['incident_count'] >= threshold
+        ]
+    
     def generate_heatmap_data(self, incidents: List[Dict]) -> Dict:
         severity_weights = {
             'low': 0.25,
@@ -135,28 +328,24 @@ class GeoService:
             }
         }
     
-    def identify_danger_zones(self, incidents: List[Dict], threshold: int = 3) -> List[Dict]:
-        clusters = self.cluster_incidents(incidents, eps_km=1.0)
-        
-        danger_zones = []
-        for cluster in clusters:
-            if cluster['incident_count'] >= threshold:
-                cluster_incidents = [inc for inc in incidents if inc.get('id') in cluster['incident_ids']]
-                categories = [inc.get('category', 'other') for inc in cluster_incidents]
-                dominant_category = max(set(categories), key=categories.count)
-                
-                danger_zones.append({
-                    "zone_id": cluster['cluster_id'],
-                    "center": cluster['center'],
-                    "radius_km": 1.0,
-                    "incident_count": cluster['incident_count'],
-                    "severity_score": cluster['severity_score'],
-                    "dominant_category": dominant_category,
-                    "nearest_police_station": cluster['nearest_police_station'],
-                    "risk_level": "high" if cluster['severity_score'] >= 3 else "medium"
-                })
-        
-        return danger_zones
+    def identify_danger_zones(self, incidents: List[Dict], threshold: int = 3, radius_km: float = 1.0) -> List[Dict]:
+        """
+        Clusters of at least `threshold` incidents within `radius_km`.
+        
+        Works directly on the DBSCAN labels and their bincount aggregates,
+        so there is no per-cluster rescan of the incident list.
+        """
+        if len(incidents) < 2:
+            return []
+        
+        labels = self._cluster_labels(incidents, radius_km)
+        aggregates = [
+            cluster for cluster in self._aggregate_clusters(incidents, labels)
+            if cluster['incident_count'] >= threshold
+        ]
+        clusters = self.summarize_clusters(aggregates, radius_km)
+        
+        return self.danger_zones_from_clusters(clusters, threshold=threshold)
 
 
-geo_service = GeoService()
+geo_service = GeoService(db_service)
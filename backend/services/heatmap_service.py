@@ -0,0 +1,260 @@
+"""
+Pre-aggregated heatmap tiles.
+
+Incidents are binned on the XYZ (Web Mercator) tile grid: every tile at
+zoom z is split into 2^HEATMAP_TILE_BIN_BITS bins per side, which are the
+pixels of zoom z + bits. Each bin carries an incident count and a summed
+severity weight, so a tile's size is bounded by its bin count no matter
+how many incidents fall inside it. Bins are rolled up from the
+materialized analytics counts when the zoom allows, summed in PostGIS
+otherwise, or with NumPy over the capped incident list without PostGIS.
+Finished tiles are cached per (category, zoom, x, y) and dropped when an
+incident inside them is written.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from config import settings
+from .db_service import db_service, DatabaseService
+from .geo_service import SEVERITY_SCORES
+from .analytics_materializer import analytics_materializer, AnalyticsMaterializer
+from .tiles import Bbox, latlng_to_pixel, pixel_to_latlng, tile_bbox
+
+
+# Highest zoom served (and invalidated on writes)
+MAX_ZOOM = 18
+
+
+class HeatmapTileService:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        materializer: Optional[AnalyticsMaterializer] = None,
+        bin_bits: int = settings.HEATMAP_TILE_BIN_BITS,
+        max_tiles: int = settings.HEATMAP_MAX_TILES,
+        cache_size: int = settings.HEATMAP_TILE_CACHE_SIZE,
+        ttl_seconds: int = settings.HEATMAP_TILE_TTL_SECONDS
+    ):
+        self.database = database
+        self.materializer = materializer
+        self.bin_bits = bin_bits
+        self.max_tiles = max_tiles
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+
+        self._tiles: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        database.add_write_listener(self.on_write)
+
+    def on_write(self, event: str, incidents: List[dict]):
+        """
+        Database write listener: drop cached tiles that contain a written incident.
+
+        Updates that leave category and severity unchanged (e.g. a
+        duplicate report bump) do not change any tile and are skipped.
+        Each batch is projected once at MAX_ZOOM; lower zooms are the same
+        pixel shifted right.
+        """
+        if event == "updated":
+            incidents = [
+                incident for incident in incidents
+                if (incident.get("previous") or {}).get("category") != incident["category"]
+                or (incident.get("previous") or {}).get("severity") != incident["severity"]
+            ]
+        with self._lock:
+            if not incidents or not self._tiles:
+                return
+
+        lats = np.array([incident["latitude"] for incident in incidents], dtype=float)
+        lngs = np.array([incident["longitude"] for incident in incidents], dtype=float)
+        x, y = latlng_to_pixel(lats, lngs, MAX_ZOOM)
+        shifts = MAX_ZOOM - np.arange(MAX_ZOOM + 1)
+        tiles_x = np.floor(x).astype(np.int64)[:, None] >> shifts
+        tiles_y = np.floor(y).astype(np.int64)[:, None] >> shifts
+        zooms = np.broadcast_to(np.arange(MAX_ZOOM + 1), tiles_x.shape)
+
+        # Every tile is cached per category and for "all categories" (None)
+        categories: Dict[Optional[str], List[int]] = {None: list(range(len(incidents)))}
+        for index, incident in enumerate(incidents):
+            for category in {incident["category"], (incident.get("previous") or {}).get("category")}:
+                if category is not None:
+                    categories.setdefault(category, []).append(index)
+
+        keys = []
+        for category, indices in categories.items():
+            tiles = np.unique(
+                np.stack([zooms[indices].ravel(), tiles_x[indices].ravel(), tiles_y[indices].ravel()], axis=1),
+                axis=0
+            )
+            keys.extend((category, zoom, x, y) for zoom, x, y in tiles.tolist())
+
+        with self._lock:
+            for key in keys:
+                self._tiles.pop(key, None)
+
+    def visible_tiles(self, bbox: Bbox, zoom: int) -> List[Tuple[int, int]]:
+        """
+        XYZ tiles covering bbox, row by row.
+
+        Raises ValueError when the bbox needs more than max_tiles tiles.
+        """
+        min_lng, min_lat, max_lng, max_lat = bbox
+        if min_lng > max_lng or min_lat > max_lat:
+            raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+
+        last = 2 ** zoom - 1
+        x0, y0 = latlng_to_pixel(max_lat, min_lng, zoom)
+        x1, y1 = latlng_to_pixel(min_lat, max_lng, zoom)
+        xs = range(max(0, int(x0)), min(last, int(x1)) + 1)
+        ys = range(max(0, int(y0)), min(last, int(y1)) + 1)
+
+        if len(xs) * len(ys) > self.max_tiles:
+            raise ValueError(
+                f"bbox covers {len(xs) * len(ys)} tiles at zoom {zoom}, the limit is {self.max_tiles}"
+            )
+        return [(x, y) for y in ys for x in xs]
+
+    def get_tiles(self, db: Session, zoom: int, bbox: Bbox, category: Optional[str] = None) -> Dict:
+        """Binned tiles covering bbox; cached tiles are reused, the rest are computed in one pass."""
+        tiles = self.visible_tiles(bbox, zoom)
+
+        found: Dict[Tuple[int, int], List[Dict]] = {}
+        missing = []
+        for tile in tiles:
+            cells = self._get_cached((category, zoom) + tile)
+            if cells is None:
+                missing.append(tile)
+            else:
+                found[tile] = cells
+
+        if missing:
+            computed = self._compute(db, zoom, missing, category)
+            for tile in missing:
+                found[tile] = computed.get(tile, [])
+                self._remember((category, zoom) + tile, found[tile])
+
+        return {
+            "zoom": zoom,
+            "bins_per_tile": 2 ** self.bin_bits,
+            "total_incidents": sum(cell["count"] for cells in found.values() for cell in cells),
+            "tiles": [{"z": zoom, "x": x, "y": y, "cells": found[(x, y)]} for x, y in tiles]
+        }
+
+    def _compute(
+        self,
+        db: Session,
+        zoom: int,
+        tiles: List[Tuple[int, int]],
+        category: Optional[str]
+    ) -> Dict[Tuple[int, int], List[Dict]]:
+        pixel_zoom = zoom + self.bin_bits
+
+        # One query over the rectangle spanning every missing tile
+        xs = [x for x, _ in tiles]
+        ys = [y for _, y in tiles]
+        min_lng, _, _, max_lat = tile_bbox(min(xs), min(ys), zoom)
+        _, min_lat, max_lng, _ = tile_bbox(max(xs), max(ys), zoom)
+        bbox = (min_lng, min_lat, max_lng, max_lat)
+
+        bins = None
+        if self.materializer is not None:
+            bins = self.materializer.heatmap_bins(pixel_zoom, bbox, category)
+        if bins is None and settings.POSTGIS_ENABLED:
+            bins = self.database.heatmap_bins_postgis(db, pixel_zoom, bbox, category)
+        if bins is None:
+            bins = self._bins_numpy(db, pixel_zoom, bbox, category)
+
+        wanted = set(tiles)
+        result: Dict[Tuple[int, int], List[Dict]] = {}
+        for px, py, count, weight in bins:
+            tile = (px >> self.bin_bits, py >> self.bin_bits)
+            if tile not in wanted:
+                continue
+            lat, lng = pixel_to_latlng(px + 0.5, py + 0.5, pixel_zoom)
+            result.setdefault(tile, []).append({
+                "lat": round(lat, 5),
+                "lng": round(lng, 5),
+                "count": count,
+                "weight": round(weight, 2)
+            })
+        return result
+
+    def _bins_numpy(self, db: Session, pixel_zoom: int, bbox: Bbox, category: Optional[str]) -> List[tuple]:
+        incidents = self.database.get_incidents(
+            db, skip=0, limit=settings.ANALYTICS_MAX_INCIDENTS, category=category
+        )
+        if not incidents:
+            return []
+
+        lats = np.array([inc.latitude for inc in incidents], dtype=float)
+        lngs = np.array([inc.longitude for inc in incidents], dtype=float)
+        weights = np.array(
+            [SEVERITY_SCORES.get(inc.severity.value if inc.severity else "medium", 2) / 4.0 for inc in incidents]
+        )
+
+        min_lng, min_lat, max_lng, max_lat = bbox
+        inside = (lngs >= min_lng) & (lngs <= max_lng) & (lats >= min_lat) & (lats <= max_lat)
+        if not inside.any():
+            return []
+
+        x, y = latlng_to_pixel(lats[inside], lngs[inside], pixel_zoom)
+        pixels, codes = np.unique(
+            np.column_stack([np.floor(x), np.floor(y)]).astype(np.int64),
+            axis=0,
+            return_inverse=True
+        )
+        codes = codes.reshape(-1)
+        counts = np.bincount(codes, minlength=len(pixels))
+        sums = np.bincount(codes, weights=weights[inside], minlength=len(pixels))
+
+        return [
+            (int(px), int(py), int(count), float(weight))
+            for (px, py), count, weight in zip(pixels, counts, sums)
+        ]
+
+    def _get_cached(self, key: tuple) -> Optional[List[Dict]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is not None:
+                cells, expires_at = entry
+                if expires_at > now:
+                    self._tiles.move_to_end(key)
+                    self.hits += 1
+                    return cells
+                del self._tiles[key]
+            self.misses += 1
+            return None
+
+    def _remember(self, key: tuple, cells: List[Dict]):
+        with self._lock:
+            self._tiles[key] = (cells, time.monotonic() + self.ttl_seconds)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tiles.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tiles": len(self._tiles),
+                "max_tiles": self.cache_size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+heatmap_tile_service = HeatmapTileService(db_service, analytics_materializer)
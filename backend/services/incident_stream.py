@@ -0,0 +1,207 @@
+"""
+In-process pub/sub for incident changes, served as Server-Sent Events.
+
+The broker is an incident write listener, so every create and every
+classification update is published once and fanned out to all open
+streams. Writes happen on worker threads; events are handed to the event
+loop with call_soon_threadsafe and all broker state is only touched there.
+
+Events are collected for INCIDENT_STREAM_COALESCE_SECONDS before being
+fanned out. A window with more than INCIDENT_STREAM_MAX_BATCH events (a
+bulk load or a classification backfill) is sent as a single "refresh"
+event instead, telling clients to reload the list, so bursts do not
+overflow subscriber queues.
+
+Recent events are kept in a ring buffer so a client reconnecting with
+Last-Event-ID receives what it missed. Event ids are "<boot>-<seq>"; if the
+id is from an earlier process or has already left the buffer the client
+gets a "reset" event and should reload the list.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from .db_service import db_service, DatabaseService
+
+
+class _Subscriber:
+
+    def __init__(self, category: Optional[str], queue_size: int):
+        self.category = category
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def wants(self, event: str, incident: dict) -> bool:
+        return event == "refresh" or self.category is None or incident.get("category") == self.category
+
+
+class IncidentBroker:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        buffer_size: int = settings.INCIDENT_STREAM_BUFFER,
+        queue_size: int = settings.INCIDENT_STREAM_QUEUE_SIZE,
+        heartbeat_seconds: float = settings.INCIDENT_STREAM_HEARTBEAT_SECONDS,
+        coalesce_seconds: float = settings.INCIDENT_STREAM_COALESCE_SECONDS,
+        max_batch: int = settings.INCIDENT_STREAM_MAX_BATCH
+    ):
+        self.queue_size = queue_size
+        self.heartbeat_seconds = heartbeat_seconds
+        self.coalesce_seconds = coalesce_seconds
+        self.max_batch = max_batch
+
+        self.boot = str(int(time.time()))
+        self._seq = 0
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._subscribers: Set[_Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[tuple] = []
+        self._pending_count = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.published = 0
+        self.coalesced = 0
+        self.dropped_subscribers = 0
+
+        database.add_write_listener(self.on_write)
+
+    def start(self):
+        """Bind to the running event loop; events before this are not streamed."""
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._pending.clear()
+        self._pending_count = 0
+        for subscriber in list(self._subscribers):
+            self._close(subscriber)
+        self._loop = None
+
+    def on_write(self, event: str, incidents: List[dict]):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if len(incidents) > self.max_batch:
+            # Becomes a "refresh" anyway; skip copying the rows
+            payloads = []
+        else:
+            payloads = [
+                {key: value for key, value in incident.items() if key != "previous"}
+                for incident in incidents
+            ]
+        loop.call_soon_threadsafe(self._collect, event, payloads, len(incidents))
+
+    def _collect(self, event: str, incidents: List[dict], count: int):
+        if self._loop is None:
+            return
+        self._pending_count += count
+        if self._pending_count <= self.max_batch:
+            self._pending.extend((event, incident) for incident in incidents)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.coalesce_seconds, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        pending, self._pending = self._pending, []
+        count, self._pending_count = self._pending_count, 0
+        if count > self.max_batch:
+            self.coalesced += count
+            self._publish("refresh", {"changed": count})
+            return
+        for event, incident in pending:
+            self._publish(event, incident)
+
+    def _publish(self, event: str, incident: dict):
+        self._seq += 1
+        message = (self._seq, event, incident)
+        self._buffer.append(message)
+        self.published += 1
+
+        for subscriber in list(self._subscribers):
+            if not subscriber.wants(event, incident):
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, it resumes from the buffer
+                self.dropped_subscribers += 1
+                self._close(subscriber)
+
+    def _close(self, subscriber: _Subscriber):
+        self._subscribers.discard(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    async def stream(self, category: Optional[str] = None, last_event_id: Optional[str] = None) -> AsyncIterator[str]:
+        """SSE-formatted events, starting after last_event_id when it is still buffered."""
+        subscriber = _Subscriber(category, self.queue_size)
+        self._subscribers.add(subscriber)
+
+        try:
+            # Events queued while replaying may repeat the replayed ones
+            sent_seq = 0
+            if last_event_id:
+                missed = self._replay(last_event_id)
+                if missed is None:
+                    yield self._format("reset", f"{self.boot}-{self._seq}", {"reason": "resume point unavailable"})
+                else:
+                    for seq, event, incident in missed:
+                        sent_seq = seq
+                        if subscriber.wants(event, incident):
+                            yield self._format(event, f"{self.boot}-{seq}", incident)
+
+            yield "retry: 3000\n\n"
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if message is None:
+                    return
+                seq, event, incident = message
+                if seq <= sent_seq:
+                    continue
+                yield self._format(event, f"{self.boot}-{seq}", incident)
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _replay(self, last_event_id: str) -> Optional[list]:
+        """Buffered events after last_event_id, or None if they are no longer all available."""
+        boot, _, seq = last_event_id.partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+
+        seq = int(seq)
+        if seq >= self._seq:
+            return []
+        oldest = self._buffer[0][0] if self._buffer else self._seq + 1
+        if seq + 1 < oldest:
+            return None
+        return [message for message in self._buffer if message[0] > seq]
+
+    def _format(self, event: str, event_id: str, data: dict) -> str:
+        payload = json.dumps(jsonable_encoder(data), separators=(",", ":"))
+        return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "buffered": len(self._buffer),
+            "coalesced": self.coalesced,
+            "dropped_subscribers": self.dropped_subscribers
+        }
+
+
+incident_broker = IncidentBroker(db_service)
@@ -0,0 +1,194 @@
+"""
+Bulk incident ingestion from NDJSON or CSV dumps.
+
+Rows are read incrementally, validated with IncidentCreate in chunks and
+bulk-inserted as "pending"; classification is left to the queue's batch
+backfill. Bad rows, including lines that are not valid UTF-8 and
+malformed CSV records, are reported individually and never abort the load.
+"""
+import codecs
+import csv
+import json
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from config import settings
+from models import IncidentCreate
+from .db_service import db_service, DatabaseService
+
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+
+class IncidentIngestor:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        chunk_size: int = settings.BULK_INGEST_CHUNK_SIZE,
+        max_errors: int = settings.BULK_INGEST_MAX_ERRORS
+    ):
+        self.database = database
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+
+    def ingest(self, stream: BinaryIO, fmt: str) -> dict:
+        """
+        Load every row from a binary stream.
+
+        Returns counts plus up to max_errors per-row errors, each with the
+        1-based row number (excluding the CSV header).
+        """
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}', expected one of {SUPPORTED_FORMATS}")
+
+        rows = self._read_ndjson(stream) if fmt == "ndjson" else self._read_csv(stream)
+
+        report = {"rows": 0, "inserted": 0, "failed": 0, "errors": []}
+        chunk: List[Tuple[int, dict]] = []
+
+        for row_number, raw in rows:
+            report["rows"] += 1
+            chunk.append((row_number, raw))
+            if len(chunk) >= self.chunk_size:
+                self._load_chunk(chunk, report)
+                chunk = []
+
+        if chunk:
+            self._load_chunk(chunk, report)
+
+        return report
+
+    def _decode_lines(self, stream: BinaryIO) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        (line, error) per line of UTF-8 input; undecodable bytes are replaced
+        and reported in error rather than aborting the whole load.
+        """
+        first = True
+        for raw in iter(stream.readline, b""):
+            if first:
+                raw = raw.removeprefix(codecs.BOM_UTF8)
+                first = False
+            try:
+                yield raw.decode("utf-8"), None
+            except UnicodeDecodeError as e:
+                yield raw.decode("utf-8", errors="replace"), f"Invalid UTF-8 at byte {e.start} of the line"
+
+    def _read_ndjson(self, stream: BinaryIO) -> Iterator[Tuple[int, object]]:
+        row_number = 0
+        for line, error in self._decode_lines(stream):
+            if not line.strip():
+                continue
+            row_number += 1
+            if error:
+                yield row_number, ValueError(error)
+                continue
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as e:
+                yield row_number, ValueError(f"Invalid JSON: {e}")
+
+    def _read_csv(self, stream: BinaryIO) -> Iterator[Tuple[int, object]]:
+        # Decoding errors seen while the reader consumed the current record
+        errors: List[str] = []
+
+        def lines() -> Iterator[str]:
+            for line, error in self._decode_lines(stream):
+                if error:
+                    errors.append(error)
+                yield line
+
+        reader = csv.DictReader(lines())
+        try:
+            reader.fieldnames
+        except csv.Error as e:
+            yield 0, ValueError(f"Invalid CSV header: {e}")
+            return
+        # A mangled header still names columns; its rows fail validation
+        errors.clear()
+        row_number = 0
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                row_number += 1
+                errors.clear()
+                yield row_number, ValueError(f"Invalid CSV: {e}")
+                continue
+
+            row_number += 1
+            if errors:
+                yield row_number, ValueError(errors[0])
+                errors.clear()
+                continue
+            yield row_number, {key: value for key, value in row.items() if key and value != ""}
+
+    def _validate(self, raw: object) -> dict:
+        if isinstance(raw, Exception):
+            raise raw
+        if not isinstance(raw, dict):
+            raise ValueError("Row must be a JSON object")
+
+        row = IncidentCreate.model_validate(raw).model_dump()
+
+        created_at = raw.get("created_at")
+        if created_at:
+            # Stored as naive UTC like datetime.utcnow(); naive input is taken as UTC
+            timestamp = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+            if timestamp.tzinfo is not None:
+                timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+            row["created_at"] = timestamp
+        else:
+            row["created_at"] = datetime.utcnow()
+        return row
+
+    def _load_chunk(self, chunk: List[Tuple[int, object]], report: dict):
+        valid: List[Tuple[int, dict]] = []
+        for row_number, raw in chunk:
+            try:
+                valid.append((row_number, self._validate(raw)))
+            except ValidationError as e:
+                details = "; ".join(
+                    f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+                )
+                self._record_error(report, row_number, details)
+            except (ValueError, TypeError) as e:
+                self._record_error(report, row_number, str(e))
+
+        if not valid:
+            return
+
+        try:
+            ids = self._insert([row for _, row in valid])
+        except Exception:
+            # Retry one row at a time so a single bad row only fails itself
+            ids = []
+            for row_number, row in valid:
+                try:
+                    ids.extend(self._insert([row]))
+                except Exception as e:
+                    self._record_error(report, row_number, f"Database error: {e}")
+
+        report["inserted"] += len(ids)
+
+    def _insert(self, rows: List[dict]) -> List[int]:
+        db = self.database.SessionLocal()
+        try:
+            return self.database.ingest_incidents(db, rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_error(self, report: dict, row_number: int, message: str):
+        report["failed"] += 1
+        if len(report["errors"]) < self.max_errors:
+            report["errors"].append({"row": row_number, "error": message})
+
+
+incident_ingestor = IncidentIngestor(db_service)
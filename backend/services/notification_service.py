@@ -1,26 +1,248 @@
-from typing import List, Dict
-from datetime import datetime
+from abc import ABC, abstractmethod
+from typing import List, Dict, Optional
+from collections import deque
+from datetime import datetime, timedelta
+import asyncio
 
+import httpx
+from fastapi.concurrency import run_in_threadpool
 
-class NotificationService:
+from config import settings
+from .db_service import db_service, DatabaseService
+from .geo_service import geo_service
+from .auth_service import user_cache, UserCache
+
+
+class NotificationProvider(ABC):
+    """Delivers one message to one recipient; raises on failure so it is retried"""
+    
+    name = "base"
+    
+    @abstractmethod
+    async def send(self, recipient: dict, message: str):
+        ...
+    
+    async def close(self):
+        pass
+
+
+class ConsoleProvider(NotificationProvider):
+    """Prints messages instead of sending them (local runs and tests)"""
+    
+    name = "console"
+    
     def __init__(self):
-        self.sent_notifications = []  
-    
-    def send_emergency_alert(
-        self, 
-        incident_data: dict, 
-        emergency_contacts: List[Dict[str, str]],
-        user_name: str
-    ) -> dict:
-        timestamp = datetime.now().isoformat()
-        notifications_sent = []
+        self.sent = deque(maxlen=500)
+    
+    async def send(self, recipient: dict, message: str):
+        label = "SMS" if recipient["kind"] == "emergency_contact" else "ALERT"
+        print(f"\n[{label}] Sending to {recipient['recipient']} ({recipient.get('phone') or 'no phone'}):")
+        print(message)
+        self.sent.append({"recipient": recipient, "message": message})
+
+
+class WebhookProvider(NotificationProvider):
+    """POSTs each message as JSON to a webhook (e.g. an n8n SMS workflow)"""
+    
+    name = "webhook"
+    
+    def __init__(self, url: str, timeout_seconds: float):
+        self.url = url
+        self.client = httpx.AsyncClient(timeout=timeout_seconds)
+    
+    async def send(self, recipient: dict, message: str):
+        response = await self.client.post(self.url, json={
+            "kind": recipient["kind"],
+            "recipient": recipient["recipient"],
+            "phone": recipient.get("phone"),
+            "incident_id": recipient["incident_id"],
+            "message": message
+        })
+        response.raise_for_status()
+    
+    async def close(self):
+        await self.client.aclose()
+
+
+def build_provider() -> NotificationProvider:
+    if settings.NOTIFICATION_PROVIDER == "webhook":
+        if not settings.NOTIFICATION_WEBHOOK_URL:
+            raise ValueError("NOTIFICATION_PROVIDER=webhook needs NOTIFICATION_WEBHOOK_URL")
+        return WebhookProvider(settings.NOTIFICATION_WEBHOOK_URL, settings.NOTIFICATION_TIMEOUT_SECONDS)
+    return ConsoleProvider()
+
+
+class NotificationService:
+    """
+    Background alert dispatch.
+    
+    dispatch_emergency_alert() returns immediately; a task reads the
+    reporter's profile from the user cache, records one "queued" row per recipient (emergency contacts
+    plus the nearest police station) and delivers them concurrently, at most
+    `concurrency` at a time across all incidents. Failed sends are retried
+    with exponential backoff, and each row ends up "sent" or "failed".
+    
+    Rows still "queued" (or "retrying", after a resend that was cut off
+    too) when a process stops are resent by
+    resume_queued() at the next startup if younger than
+    NOTIFICATION_REDELIVER_HOURS, and marked failed otherwise.
+    """
+    
+    def __init__(
+        self,
+        database: DatabaseService,
+        users: UserCache,
+        provider: Optional[NotificationProvider] = None,
+        concurrency: int = settings.NOTIFICATION_CONCURRENCY,
+        max_retries: int = settings.NOTIFICATION_MAX_RETRIES,
+        retry_backoff: float = settings.NOTIFICATION_RETRY_BACKOFF_SECONDS
+    ):
+        self.database = database
+        self.users = users
+        self.provider = provider or build_provider()
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
         
-        message = f"""
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        
+        self.sent_notifications = deque(maxlen=500)
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+    
+    def dispatch_emergency_alert(self, incident_id: int, incident_data: dict, user_id: int, notify_authority: bool = True):
+        """
+        Schedule alerts for an incident reported by user_id; never waits on delivery.
+        
+        notify_authority=False alerts only the reporter's contacts, for
+        duplicate reports of an incident the police were already sent.
+        """
+        task = asyncio.create_task(self._dispatch(incident_id, incident_data, user_id, notify_authority))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def resume_queued(self):
+        """Schedule redelivery of alerts an earlier process left unfinished"""
+        task = asyncio.create_task(self._resume_queued())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _resume_queued(self):
+        now = datetime.utcnow()
+        try:
+            # Deliveries newer than this may still be in flight in another worker
+            in_flight = timedelta(seconds=self.max_retries * (
+                settings.NOTIFICATION_TIMEOUT_SECONDS + self.retry_backoff * 2 ** self.max_retries
+            ))
+            claimed = await run_in_threadpool(
+                self.database.claim_queued_notifications,
+                now - in_flight,
+                now - timedelta(hours=settings.NOTIFICATION_REDELIVER_HOURS)
+            )
+        except Exception as e:
+            print(f"[NOTIFY] Could not load queued notifications: {e}")
+            return
+        
+        if claimed:
+            print(f"[NOTIFY] Redelivering {len(claimed)} notifications left unfinished")
+        await asyncio.gather(*[
+            self._deliver(
+                notification["id"],
+                notification,
+                self._contact_message(incident, incident["reporter_name"], notification["created_at"].isoformat())
+                if notification["kind"] == "emergency_contact"
+                else self._authority_message(incident, incident["reporter_name"], notification["created_at"].isoformat())
+            )
+            for notification, incident in claimed
+        ])
+    
+    async def stop(self, timeout: float = 10.0):
+        """Give in-flight deliveries a chance to finish, then close the provider"""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+        await self.provider.close()
+    
+    async def _dispatch(self, incident_id: int, incident_data: dict, user_id: int, notify_authority: bool):
+        try:
+            user = await self.users.get(user_id)
+            if not user or not user["emergency_contacts"]:
+                return
+            
+            timestamp = datetime.now().isoformat()
+            recipients = [
+                {
+                    "incident_id": incident_id,
+                    "kind": "emergency_contact",
+                    "recipient": contact['name'],
+                    "phone": contact['phone']
+                }
+                for contact in user["emergency_contacts"]
+            ]
+            if notify_authority:
+                station = geo_service.find_nearest_landmark(
+                    incident_data['latitude'], incident_data['longitude'], "police_stations"
+                )
+                recipients.append({
+                    "incident_id": incident_id,
+                    "kind": "authority",
+                    "recipient": station['name'] if station else "Local Police Station",
+                    "phone": station.get('phone') if station else None
+                })
+            
+            ids = await run_in_threadpool(self.database.create_notifications, [
+                {**recipient, "provider": self.provider.name, "status": "queued"}
+                for recipient in recipients
+            ])
+            
+            contact_message = self._contact_message(incident_data, user["name"], timestamp)
+            authority_message = self._authority_message(incident_data, user["name"], timestamp)
+            await asyncio.gather(*[
+                self._deliver(
+                    notification_id,
+                    recipient,
+                    contact_message if recipient["kind"] == "emergency_contact" else authority_message
+                )
+                for notification_id, recipient in zip(ids, recipients)
+            ])
+        except Exception as e:
+            print(f"[NOTIFY] Dispatch for incident {incident_id} failed: {e}")
+    
+    async def _deliver(self, notification_id: int, recipient: dict, message: str):
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    await self.provider.send(recipient, message)
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+                print(f"[NOTIFY] {recipient['recipient']} attempt {attempt} failed: {error}")
+                if attempt < self.max_retries:
+                    self.retries += 1
+                    await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+                continue
+            
+            self.sent += 1
+            self.sent_notifications.append({**recipient, "status": "sent", "timestamp": datetime.now().isoformat()})
+            await self._record(notification_id, "sent", attempt)
+            return
+        
+        self.failed += 1
+        await self._record(notification_id, "failed", self.max_retries, error)
+    
+    async def _record(self, notification_id: int, status: str, attempts: int, error: Optional[str] = None):
+        try:
+            await run_in_threadpool(self.database.update_notification, notification_id, status, attempts, error)
+        except Exception as e:
+            print(f"[NOTIFY] Could not record status of notification {notification_id}: {e}")
+    
+    def _contact_message(self, incident_data: dict, user_name: str, timestamp: str) -> str:
+        return f"""
 EMERGENCY ALERT
 
 {user_name} has reported an incident:
 - {incident_data['title']}
-- Severity: {incident_data.get('severity', 'UNKNOWN').upper()}
+- Severity: {(incident_data.get('severity') or 'UNKNOWN').upper()}
 - Location: {incident_data['latitude']}, {incident_data['longitude']}
 - Time: {timestamp}
 
@@ -28,45 +250,16 @@ Description: {incident_data['description']}
 
 This is an automated safety alert from Urban Safety Platform.
         """
-        
-        for contact in emergency_contacts:
-            print(f"\n[SMS] Sending to {contact['name']} ({contact['phone']}):")
-            print(message)
-            notifications_sent.append({
-                "recipient": contact['name'],
-                "phone": contact['phone'],
-                "type": "emergency_contact",
-                "status": "sent",
-                "timestamp": timestamp
-            })
-        
-        self._alert_authorities(incident_data, user_name, timestamp)
-        notifications_sent.append({
-            "recipient": "Local Police Station",
-            "type": "authority",
-            "status": "sent",
-            "timestamp": timestamp
-        })
-        
-        self.sent_notifications.extend(notifications_sent)
-        
-        return {
-            "success": True,
-            "notifications_sent": len(notifications_sent),
-            "details": notifications_sent
-        }
     
-    def _alert_authorities(self, incident_data: dict, reporter: str, timestamp: str):
-        """Mock alert to authorities"""
-        print("\n[ALERT] Notifying MOCK AUTHORITIES (Police Control Room):")
-        print(f"""
+    def _authority_message(self, incident_data: dict, reporter: str, timestamp: str) -> str:
+        return f"""
 ==========================================
 INCIDENT REPORT - REQUIRES ATTENTION
 ==========================================
 
 Incident: {incident_data['title']}
-Category: {incident_data.get('category', 'OTHER').upper()}
-Severity: {incident_data.get('severity', 'MEDIUM').upper()}
+Category: {(incident_data.get('category') or 'OTHER').upper()}
+Severity: {(incident_data.get('severity') or 'MEDIUM').upper()}
 
 Location: 
   Lat: {incident_data['latitude']}
@@ -78,14 +271,23 @@ Description:
 Reporter: {reporter}
 Time: {timestamp}
 
-AI Summary: {incident_data.get('ai_summary', 'Processing...')}
+AI Summary: {incident_data.get('ai_summary') or 'Processing...'}
 
 ==========================================
-        """)
+        """
     
-    def get_notification_history(self) -> List[dict]:
-        """Get all sent notifications (for demo/debugging)"""
-        return self.sent_notifications
+    def get_notification_history(self) -> List[Dict]:
+        """Recently sent notifications (for demo/debugging)"""
+        return list(self.sent_notifications)
+    
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "in_flight": len(self._tasks),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries
+        }
 
 
-notification_service = NotificationService()
+notification_service = NotificationService(db_service, user_cache)
@@ -0,0 +1,68 @@
+"""
+bcrypt hashing off the event loop.
+
+Hashes and verifies run on a small dedicated thread pool (bcrypt releases
+the GIL), so a burst of logins queues there instead of freezing request
+handling or starving the shared threadpool used for database calls.
+The cost is BCRYPT_ROUNDS; hashes made under another cost are upgraded
+on the next successful login.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from config import settings
+
+
+class PasswordHasher:
+
+    def __init__(self, rounds: int = settings.BCRYPT_ROUNDS, workers: int = settings.PASSWORD_HASH_WORKERS):
+        self.rounds = rounds
+        # min == max == default: any hash with a different cost needs an update
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds
+        )
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+
+    async def hash(self, password: str) -> str:
+        self.hashed += 1
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """
+        (valid, new_hash); new_hash is set when the password is valid but its
+        stored hash does not match the current cost policy.
+        """
+        self.verified += 1
+        valid, new_hash = await self._run(self.context.verify_and_update, password, password_hash)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed
+        }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,131 @@
+"""
+Serialized JSON responses for polled GET endpoints, with ETag support.
+
+Entries are keyed on the request path and query string and tagged with a
+data version that every incident write bumps, so a write invalidates them
+immediately; the per-route TTL bounds staleness from writes made by other
+processes. ETags are a hash of the body, so a client revalidating with
+If-None-Match gets a 304 whenever the content is unchanged, even after
+the entry has been recomputed.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from .db_service import db_service, DatabaseService
+
+
+class ResponseCache:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        max_entries: int = settings.RESPONSE_CACHE_SIZE,
+        max_body_bytes: int = settings.RESPONSE_CACHE_MAX_BODY_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+
+        # key -> (body, etag, version, expires_at)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+        database.add_write_listener(self.on_write)
+
+    def on_write(self, event: str, incidents: List[dict]):
+        with self._lock:
+            self.version += 1
+
+    async def respond(
+        self,
+        request: Request,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: float
+    ) -> Response:
+        """
+        Cached JSON response for this request, or 304 if If-None-Match matches.
+
+        compute() produces the JSON-compatible payload on a miss.
+        """
+        key = self._key(request)
+        entry = self._get(key)
+
+        if entry is None:
+            version = self.version
+            payload = await compute()
+            body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            self._set(key, body, etag, version, ttl_seconds)
+        else:
+            body, etag = entry
+
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if self._matches(request.headers.get("if-none-match"), etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def _key(self, request: Request) -> str:
+        query = "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{query}"
+
+    def _matches(self, if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    def _get(self, key: str) -> Optional[tuple]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, etag, version, expires_at = entry
+                if version == self.version and expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body, etag
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def _set(self, key: str, body: bytes, etag: str, version: int, ttl_seconds: float):
+        if len(body) > self.max_body_bytes:
+            return
+        with self._lock:
+            self._entries[key] = (body, etag, version, time.monotonic() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified
+            }
+
+
+response_cache = ResponseCache(db_service)
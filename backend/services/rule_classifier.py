@@ -0,0 +1,145 @@
+"""
+Keyword/regex pre-classifier that runs before the LLM.
+
+Reports that mention an unambiguous keyword ("bike stolen", "stabbed",
+"car accident") are classified in microseconds; anything below the
+confidence threshold is escalated to the Ollama chain.
+"""
+import re
+import threading
+from typing import Optional, List, Tuple
+
+from config import settings
+
+
+def _compile(patterns: List[Tuple[str, float]]) -> List[Tuple[re.Pattern, float]]:
+    return [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+
+
+# (pattern, weight) per category; a weight of 2.0 is enough on its own for
+# full-strength evidence, weaker cues need company
+CATEGORY_RULES = {
+    "theft": _compile([
+        (r"\b(stolen|stole|steal\w*|theft|thief|thieves)\b", 2.0),
+        (r"\b(robbed|robbery|robber\w*|burglar\w*|break[- ]?in|broke into)\b", 2.5),
+        (r"\b(pickpocket\w*|snatch\w*|shoplift\w*|looted|mugged|mugging)\b", 2.0),
+        (r"\b(missing|took my|taken from)\b", 0.5),
+    ]),
+    "assault": _compile([
+        (r"\b(stab\w*|shooting|gunfire|gunshots?)\b", 2.0),
+        # Bare "shot" / "beat" are too ambiguous ("shot a video", "on the beat")
+        (r"\b(((was|were|got|been|being|is|are) shot)|shot (at|dead|him|her|me|us|them))\b", 2.0),
+        (r"\b(assault\w*|beaten|beating|beat (up|him|her|me|us|them)|punch\w*|kick(ed|ing))\b", 2.0),
+        (r"\battack\w*\b", 1.0),
+        (r"\b(fight\w*|fought|brawl\w*|violen\w*)\b", 1.5),
+        (r"\b(injured|bleeding|hurt)\b", 0.5),
+    ]),
+    "vandalism": _compile([
+        (r"\b(vandal\w*|graffiti|defaced)\b", 2.0),
+        (r"\b(smashed|broken|shattered)\s+(window|windows|glass|windshield)\b", 2.0),
+        (r"\b(damaged|destroyed|set on fire)\b", 0.75),
+    ]),
+    "traffic": _compile([
+        (r"\b(accident|collision|collided|crash\w*|hit[- ]and[- ]run|pile[- ]?up)\b", 2.0),
+        (r"\b(rash|drunk|reckless)\s+driv\w*\b", 2.0),
+    ]),
+    "suspicious_activity": _compile([
+        (r"\b(loiter\w*|stalk\w*|prowl\w*)\b", 2.0),
+        (r"\b(follow(ed|ing) (me|her|him|us|them))\b", 2.0),
+        (r"\b(suspicious|lurking|peeping)\b", 1.5),
+    ]),
+}
+
+CRITICAL_CUES = re.compile(
+    r"\b(gun\w*|pistol|firearm|armed|knife|knives|weapon\w*|stabbed|"
+    r"(was|were|got|been|is|are) shot|shot (at|dead)|"
+    r"unconscious|dying|dead|kidnap\w*|hostage)\b",
+    re.IGNORECASE
+)
+# Non-criminal uses of "attack" (medical, animal); such reports go to the LLM
+NON_CRIMINAL_ATTACK = re.compile(
+    r"\b(heart|panic|anxiety|asthma\w*|dog|stray|animal|bull|cow|monkey|bee)s?\s+attack\w*\b",
+    re.IGNORECASE
+)
+INJURY_CUES = re.compile(r"\b(injur\w*|bleeding|hurt|hospital\w*|ambulance)\b", re.IGNORECASE)
+
+BASE_SEVERITY = {
+    "theft": "high",
+    "assault": "high",
+    "vandalism": "medium",
+    "traffic": "medium",
+    "suspicious_activity": "medium",
+}
+
+FULL_STRENGTH = 2.0
+
+
+class RuleClassifier:
+
+    def __init__(self, threshold: float = settings.RULE_CLASSIFIER_THRESHOLD):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.escalations = 0
+
+    def score(self, title: str, description: str) -> Tuple[Optional[str], float]:
+        """
+        Best category and a 0..1 confidence.
+
+        Confidence is the winner's share of all matched evidence, scaled
+        down when the winner's own evidence is weak.
+        """
+        text = f"{title}\n{description}"
+        if NON_CRIMINAL_ATTACK.search(text):
+            return None, 0.0
+
+        scores = {}
+        for category, rules in CATEGORY_RULES.items():
+            total = sum(weight for pattern, weight in rules if pattern.search(text))
+            if total:
+                scores[category] = total
+
+        if not scores:
+            return None, 0.0
+
+        ranked = sorted(scores.values(), reverse=True)
+        top = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else 0.0
+        category = max(scores, key=scores.get)
+
+        margin = top / (top + runner_up)
+        strength = min(1.0, top / FULL_STRENGTH)
+        return category, round(margin * strength, 3)
+
+    def classify(self, title: str, description: str) -> Optional[dict]:
+        """Result in IncidentClassifier format, or None to escalate to the LLM."""
+        category, confidence = self.score(title, description)
+
+        if category is None or confidence < self.threshold:
+            with self._lock:
+                self.escalations += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+
+        text = f"{title}\n{description}"
+        severity = BASE_SEVERITY[category]
+        if CRITICAL_CUES.search(text):
+            severity = "critical"
+        elif INJURY_CUES.search(text):
+            severity = "high"
+
+        return {
+            "category": category,
+            "severity": severity,
+            "ai_summary": " ".join(title.split()[:15])
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "escalations": self.escalations
+            }
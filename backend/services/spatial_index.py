@@ -0,0 +1,232 @@
+"""
+In-memory spatial indexes used by GeoService.
+"""
+import heapq
+import threading
+from datetime import datetime, timedelta
+from math import asin, cos, floor, radians, sin, sqrt
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.neighbors import BallTree
+
+
+EARTH_RADIUS_KM = 6371.0
+
+KM_PER_DEGREE = 111.32
+
+
+class LandmarkIndex:
+    """
+    Per-type BallTrees (haversine metric) over the landmark dataset.
+
+    Every top-level list in the landmarks JSON whose entries carry
+    lat/lng is indexed under its key ("police_stations", "hospitals",
+    "landmarks", ...), so nearest/k-nearest/within-radius lookups are
+    O(log n) instead of a linear scan.
+    """
+
+    def __init__(self, landmarks_data: Dict):
+        self.landmarks: Dict[str, List[Dict]] = {}
+        self.trees: Dict[str, BallTree] = {}
+
+        for landmark_type, entries in landmarks_data.items():
+            if not isinstance(entries, list):
+                continue
+            points = [entry for entry in entries if 'lat' in entry and 'lng' in entry]
+            if not points:
+                continue
+
+            coords = np.radians([[entry['lat'], entry['lng']] for entry in points])
+            self.landmarks[landmark_type] = points
+            self.trees[landmark_type] = BallTree(coords, metric='haversine')
+
+    def types(self) -> List[str]:
+        return list(self.trees)
+
+    def nearest(self, lat: float, lng: float, landmark_type: str, k: int = 1) -> List[Tuple[Dict, float]]:
+        """Up to k (landmark, distance_km) pairs, closest first."""
+        tree = self.trees.get(landmark_type)
+        if tree is None:
+            return []
+
+        k = min(k, len(self.landmarks[landmark_type]))
+        distances, indices = tree.query(np.radians([[lat, lng]]), k=k)
+        return [
+            (self.landmarks[landmark_type][i], float(d) * EARTH_RADIUS_KM)
+            for d, i in zip(distances[0], indices[0])
+        ]
+
+    def within(self, lat: float, lng: float, radius_km: float, landmark_type: str) -> List[Tuple[Dict, float]]:
+        """All (landmark, distance_km) pairs within radius_km, closest first."""
+        tree = self.trees.get(landmark_type)
+        if tree is None:
+            return []
+
+        indices, distances = tree.query_radius(
+            np.radians([[lat, lng]]),
+            r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True,
+            sort_results=True
+        )
+        return [
+            (self.landmarks[landmark_type][i], float(d) * EARTH_RADIUS_KM)
+            for d, i in zip(distances[0], indices[0])
+        ]
+
+    def nearest_batch(self, lats: np.ndarray, lngs: np.ndarray, landmark_type: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Nearest landmark for many points in one tree query.
+
+        Returns (indices into the landmark list, distances in km), or None
+        if the type has no landmarks.
+        """
+        tree = self.trees.get(landmark_type)
+        if tree is None:
+            return None
+
+        coords = np.radians(np.column_stack([lats, lngs]))
+        distances, indices = tree.query(coords, k=1)
+        return indices[:, 0], distances[:, 0] * EARTH_RADIUS_KM
+
+    def get(self, landmark_type: str, index: int) -> Dict:
+        return self.landmarks[landmark_type][index]
+
+
+class RecentIncidentIndex:
+    """
+    Uniform lat/lng grid over the incidents created in the last window_hours.
+
+    Incidents are bucketed into cells of about cell_km a side (measured in
+    latitude; cells narrow in km away from the equator, which only means a
+    few more of them are scanned). A radius query visits the cells overlapping
+    the radius' bounding box and checks exact haversine distances, so its cost
+    depends on local density rather than on the total incident count.
+
+    Entries are evicted in created_at order once they leave the window, or
+    oldest first when more than max_incidents are held. All methods are
+    thread-safe; writes arrive from the database write listener on worker
+    threads.
+    """
+
+    # Fields kept per incident and returned by nearby()
+    FIELDS = ("id", "title", "description", "category", "severity", "latitude", "longitude", "report_count", "created_at")
+
+    def __init__(self, window_hours: float, cell_km: float, max_incidents: int):
+        self.window = timedelta(hours=window_hours)
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.max_incidents = max_incidents
+
+        # (cell_y, cell_x) -> {incident_id: entry}
+        self._cells: Dict[Tuple[int, int], Dict[int, Dict]] = {}
+        # incident_id -> (cell, entry)
+        self._entries: Dict[int, Tuple[Tuple[int, int], Dict]] = {}
+        # (created_at, incident_id), oldest first
+        self._expiry: List[Tuple[datetime, int]] = []
+        self._lock = threading.Lock()
+
+        self.evicted = 0
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return floor(lat / self.cell_deg), floor(lng / self.cell_deg)
+
+    def on_write(self, event: str, incidents: List[Dict]):
+        """Database write listener: index new incidents, refresh updated ones."""
+        with self._lock:
+            for incident in incidents:
+                if event == "created":
+                    self._insert(incident)
+                else:
+                    found = self._entries.get(incident["id"])
+                    if found is not None:
+                        found[1].update(
+                            category=incident["category"],
+                            severity=incident["severity"],
+                            report_count=incident["report_count"]
+                        )
+            self._evict(datetime.utcnow() - self.window)
+
+    def load(self, incidents: List[Dict]):
+        """Replace the contents with incidents (snapshot dicts), e.g. at startup."""
+        with self._lock:
+            self._cells.clear()
+            self._entries.clear()
+            self._expiry.clear()
+            for incident in incidents:
+                self._insert(incident)
+            self._evict(datetime.utcnow() - self.window)
+
+    def _insert(self, incident: Dict):
+        created_at = incident["created_at"]
+        if incident["id"] in self._entries or created_at < datetime.utcnow() - self.window:
+            return
+
+        entry = {field: incident[field] for field in self.FIELDS}
+        cell = self._cell(incident["latitude"], incident["longitude"])
+        self._cells.setdefault(cell, {})[incident["id"]] = entry
+        self._entries[incident["id"]] = (cell, entry)
+        heapq.heappush(self._expiry, (created_at, incident["id"]))
+
+    def _evict(self, cutoff: datetime):
+        while self._expiry and (self._expiry[0][0] < cutoff or len(self._expiry) > self.max_incidents):
+            _, incident_id = heapq.heappop(self._expiry)
+            cell, _ = self._entries.pop(incident_id)
+            bucket = self._cells[cell]
+            del bucket[incident_id]
+            if not bucket:
+                del self._cells[cell]
+            self.evicted += 1
+
+    def nearby(
+        self,
+        lat: float,
+        lng: float,
+        radius_km: float,
+        hours: float,
+        category: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Dict, float]]:
+        """(incident, distance_km) pairs within radius_km created in the last hours, closest first."""
+        now = datetime.utcnow()
+        since = now - min(timedelta(hours=hours), self.window)
+
+        lat_span = radius_km / KM_PER_DEGREE
+        lng_span = radius_km / (KM_PER_DEGREE * max(cos(radians(lat)), 0.01))
+        y0, x0 = self._cell(lat - lat_span, lng - lng_span)
+        y1, x1 = self._cell(lat + lat_span, lng + lng_span)
+
+        lat_r = radians(lat)
+        cos_lat = cos(lat_r)
+        found = []
+        with self._lock:
+            self._evict(now - self.window)
+            for cy in range(y0, y1 + 1):
+                for cx in range(x0, x1 + 1):
+                    bucket = self._cells.get((cy, cx))
+                    if not bucket:
+                        continue
+                    for entry in bucket.values():
+                        if entry["created_at"] < since:
+                            continue
+                        if category and entry["category"] != category:
+                            continue
+                        other_r = radians(entry["latitude"])
+                        a = (
+                            sin((other_r - lat_r) / 2) ** 2
+                            + cos_lat * cos(other_r) * sin(radians(entry["longitude"] - lng) / 2) ** 2
+                        )
+                        distance_km = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+                        if distance_km <= radius_km:
+                            found.append((dict(entry), distance_km))
+
+        found.sort(key=lambda pair: pair[1])
+        return found[:limit] if limit else found
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "incidents": len(self._entries),
+                "cells": len(self._cells),
+                "window_hours": self.window.total_seconds() / 3600,
+                "evicted": self.evicted
+            }
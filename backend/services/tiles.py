@@ -0,0 +1,38 @@
+"""
+XYZ (Web Mercator) tile and pixel math shared by the heatmap and analytics
+services. A "pixel" at zoom z is a tile at zoom z, so bins of a tile at zoom
+z are the pixels of zoom z + bits.
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+Bbox = Tuple[float, float, float, float]  # min_lng, min_lat, max_lng, max_lat
+
+
+def latlng_to_pixel(lat, lng, zoom: int):
+    """Fractional XYZ pixel coordinates at `zoom` (1 pixel = 1 tile at that zoom)."""
+    scale = 2.0 ** zoom
+    lat_radians = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lng, dtype=float) + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(lat_radians) + 1.0 / np.cos(lat_radians)) / math.pi) / 2.0 * scale
+    return x, y
+
+
+def pixel_to_latlng(x: float, y: float, zoom: int) -> Tuple[float, float]:
+    """(lat, lng) of a fractional pixel position at `zoom`."""
+    scale = 2.0 ** zoom
+    lng = x / scale * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / scale))))
+    return lat, lng
+
+
+def tile_bbox(x: int, y: int, zoom: int) -> Bbox:
+    north, west = pixel_to_latlng(x, y, zoom)
+    south, east = pixel_to_latlng(x + 1, y + 1, zoom)
+    return west, south, east, north
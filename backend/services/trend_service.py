@@ -0,0 +1,139 @@
+"""
+Hourly incident rollups for trend analytics.
+
+incident_rollups holds incident and report counts per hour x category x
+severity x grid cell (XYZ tile at TRENDS_CELL_ZOOM). A background
+compactor folds in everything written since its updated_at watermark
+every TRENDS_COMPACT_SECONDS, recounting only the hours those writes
+touched. Trend queries read the rollup rows in the requested time range,
+so their cost depends on the range and the number of active cells, not on
+the total number of incidents.
+
+The watermark trails the clock by TRENDS_COMPACT_LAG_SECONDS so rows
+committed just after their updated_at was taken are not skipped; trends
+are therefore up to interval + lag behind.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from .db_service import db_service, DatabaseService
+from .tiles import Bbox, latlng_to_pixel
+
+
+BUCKETS = ("hour", "day", "week")
+GROUPS = ("category", "severity")
+
+
+class TrendRollup:
+
+    def __init__(
+        self,
+        database: DatabaseService,
+        cell_zoom: int = settings.TRENDS_CELL_ZOOM,
+        interval_seconds: float = settings.TRENDS_COMPACT_SECONDS,
+        lag_seconds: float = settings.TRENDS_COMPACT_LAG_SECONDS
+    ):
+        self.database = database
+        self.cell_zoom = cell_zoom
+        self.interval_seconds = interval_seconds
+        self.lag_seconds = lag_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        self.watermark: Optional[datetime] = None
+        self.last_run: Optional[dict] = None
+        self.runs = 0
+        self.failures = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await run_in_threadpool(self.compact)
+            except Exception as e:
+                self.failures += 1
+                print(f"[TRENDS] Rollup compaction failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def compact(self) -> dict:
+        """Fold incidents written up to now - lag into the rollup table."""
+        until = datetime.utcnow() - timedelta(seconds=self.lag_seconds)
+        started = time.perf_counter()
+
+        db = self.database.SessionLocal()
+        try:
+            result = self.database.compact_incident_rollups(db, until, self.cell_zoom)
+        finally:
+            db.close()
+
+        self.watermark = result["watermark"]
+        self.last_run = {**result, "seconds": round(time.perf_counter() - started, 3)}
+        self.runs += 1
+        return self.last_run
+
+    def trends(
+        self,
+        bucket: str,
+        since: datetime,
+        until: datetime,
+        group_by: Optional[str] = None,
+        category: Optional[str] = None,
+        severity: Optional[str] = None,
+        bbox: Optional[Bbox] = None
+    ) -> Dict:
+        """Counts per bucket (and group) in [since, until), optionally within bbox."""
+        cells = None
+        if bbox is not None:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            x0, y0 = latlng_to_pixel(max_lat, min_lng, self.cell_zoom)
+            x1, y1 = latlng_to_pixel(min_lat, max_lng, self.cell_zoom)
+            cells = (int(x0), int(y0), int(x1), int(y1))
+
+        db = self.database.SessionLocal()
+        try:
+            rows = self.database.incident_trends(
+                db, bucket, since, until,
+                group_by=group_by, category=category, severity=severity, cells=cells
+            )
+        finally:
+            db.close()
+
+        series = []
+        for bucket_start, group, incident_count, report_count in rows:
+            point = {"bucket": bucket_start, "incidents": incident_count, "reports": report_count}
+            if group_by:
+                point[group_by] = group
+            series.append(point)
+
+        return {
+            "bucket": bucket,
+            "since": since,
+            "until": until,
+            "group_by": group_by,
+            "total_incidents": sum(point["incidents"] for point in series),
+            "compacted_through": self.watermark,
+            "series": series
+        }
+
+    def stats(self) -> dict:
+        return {
+            "watermark": self.watermark,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run
+        }
+
+
+trend_rollup = TrendRollup(db_service)
@@ -0,0 +1,31 @@
+import pytest
+
+from services.auth_service import TokenSigner
+
+
+@pytest.mark.parametrize("secret_key", ["change-me", "CHANGEME", " secret "])
+def test_placeholder_secret_key_is_rejected(secret_key):
+    with pytest.raises(ValueError):
+        TokenSigner(secret_key, debug=True)
+
+
+def test_empty_secret_key_is_rejected_outside_debug():
+    with pytest.raises(ValueError):
+        TokenSigner("", debug=False)
+
+
+def test_empty_secret_key_uses_a_random_key_in_debug():
+    a, b = TokenSigner("", debug=True), TokenSigner("", debug=True)
+
+    assert a.verify(a.issue(7)) == 7
+    assert b.verify(a.issue(7)) is None
+
+
+def test_tampered_token_is_rejected():
+    signer = TokenSigner("a-long-random-test-key", debug=False)
+    payload, _, signature = signer.issue(7).partition(".")
+    other = TokenSigner("another-long-random-key", debug=False).issue(7)
+
+    assert signer.verify(f"{payload}.") is None
+    assert signer.verify(f"{payload}.{other.partition('.')[2]}") is None
+    assert signer.verify("é.é") is None
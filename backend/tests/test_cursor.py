@@ -0,0 +1,42 @@
+import base64
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from routes.incidents import _decode_cursor, _encode_cursor
+
+
+@pytest.mark.parametrize("created_at, incident_id", [
+    (datetime(2025, 10, 13, 10, 30), 1),
+    (datetime(2025, 10, 13, 10, 30, 0, 123456), 987654321),
+    (datetime(1999, 1, 1), 42),
+])
+def test_cursor_round_trip(created_at, incident_id):
+    cursor = _encode_cursor(SimpleNamespace(created_at=created_at, id=incident_id))
+
+    assert "=" not in cursor
+    assert _decode_cursor(cursor) == (created_at, incident_id)
+
+
+def encoded(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not a cursor!",
+    encoded(b"not json"),
+    encoded(b"\xff\xfe"),
+    encoded(b"5"),
+    encoded(b'["2025-10-13T10:30:00"]'),
+    encoded(b'["yesterday", 1]'),
+    encoded(b'[1, 2]'),
+    encoded(b'["2025-10-13T10:30:00", "abc"]'),
+])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor(cursor)
+
+    assert exc.value.status_code == 400
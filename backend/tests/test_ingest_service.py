@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from services.ingest_service import IncidentIngestor
+
+
+class FakeSession:
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Records ingested rows instead of writing them"""
+
+    def __init__(self):
+        self.rows = []
+
+    def SessionLocal(self):
+        return FakeSession()
+
+    def ingest_incidents(self, db, rows):
+        start = len(self.rows)
+        self.rows.extend(rows)
+        return list(range(start + 1, start + len(rows) + 1))
+
+
+def incident(**overrides):
+    row = {
+        "title": "Chain snatched at bus stand",
+        "description": "Two men on a bike snatched a gold chain",
+        "latitude": 30.34,
+        "longitude": 76.38,
+        "reporter_name": "Priya",
+        "reporter_phone": "9876543210",
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+
+@pytest.fixture
+def ingestor(database):
+    return IncidentIngestor(database, chunk_size=2, max_errors=10)
+
+
+def ndjson(*rows) -> bytes:
+    return b"".join(json.dumps(row).encode() + b"\n" for row in rows)
+
+
+def test_ndjson_rows_are_inserted_in_chunks(ingestor, database):
+    report = ingestor.ingest(io.BytesIO(ndjson(incident(), incident(), incident())), "ndjson")
+
+    assert report == {"rows": 3, "inserted": 3, "failed": 0, "errors": []}
+    assert len(database.rows) == 3
+
+
+def test_ndjson_bad_rows_are_reported_individually(ingestor, database):
+    body = (
+        ndjson(incident())
+        + b"{not json\n"
+        + ndjson(incident(latitude=99))
+        + b'{"title": "Caf\xe9 window smashed"}\n'
+        + ndjson(incident())
+    )
+    report = ingestor.ingest(io.BytesIO(body), "ndjson")
+
+    assert report["rows"] == 5
+    assert report["inserted"] == 2
+    assert [error["row"] for error in report["errors"]] == [2, 3, 4]
+    assert report["errors"][0]["error"].startswith("Invalid JSON")
+    assert "latitude" in report["errors"][1]["error"]
+    assert report["errors"][2]["error"].startswith("Invalid UTF-8")
+
+
+def test_csv_with_bom_and_invalid_utf8_line(ingestor, database):
+    header = "title,description,latitude,longitude,reporter_name,reporter_phone\n"
+    good = "Chain snatched at bus stand,Two men on a bike snatched it,30.34,76.38,Priya,9876543210\n"
+    body = b"\xef\xbb\xbf" + header.encode() + good.encode() + b"Caf\xe9 smashed,Glass broken everywhere,30.3,76.3,Ab,9876543210\n" + good.encode()
+
+    report = ingestor.ingest(io.BytesIO(body), "csv")
+
+    assert report["rows"] == 3
+    assert report["inserted"] == 2
+    assert report["errors"] == [{"row": 2, "error": "Invalid UTF-8 at byte 3 of the line"}]
+
+
+def test_csv_error_does_not_abort_the_load(ingestor, database):
+    header = "title,description,latitude,longitude,reporter_name,reporter_phone\n"
+    good = "Chain snatched at bus stand,Two men on a bike snatched it,30.34,76.38,Priya,9876543210\n"
+    oversized = "x" * (csv.field_size_limit() + 1)
+    body = (header + good + f"{oversized},x,1,2,a,b\n" + good).encode()
+
+    report = ingestor.ingest(io.BytesIO(body), "csv")
+
+    assert report["inserted"] == 2
+    assert [error["row"] for error in report["errors"]] == [2]
+    assert report["errors"][0]["error"].startswith("Invalid CSV")
+
+
+def test_created_at_offsets_are_converted_to_utc(ingestor, database):
+    body = ndjson(
+        incident(created_at="2025-10-13T10:30:00+05:30"),
+        incident(created_at="2025-10-13T10:30:00Z"),
+        incident(created_at="2025-10-13T10:30:00"),
+    )
+    ingestor.ingest(io.BytesIO(body), "ndjson")
+
+    assert [row["created_at"] for row in database.rows] == [
+        datetime(2025, 10, 13, 5, 0),
+        datetime(2025, 10, 13, 10, 30),
+        datetime(2025, 10, 13, 10, 30),
+    ]
+
+
+def test_unknown_format_is_rejected(ingestor):
+    with pytest.raises(ValueError):
+        ingestor.ingest(io.BytesIO(b""), "xml")
@@ -0,0 +1,24 @@
+import pytest
+
+from services.tiles import latlng_to_pixel, pixel_to_latlng, tile_bbox
+
+
+def test_origin_is_the_map_centre():
+    x, y = latlng_to_pixel(0.0, 0.0, 1)
+
+    assert (float(x), float(y)) == pytest.approx((1.0, 1.0))
+
+
+@pytest.mark.parametrize("lat, lng, zoom", [(30.34, 76.38, 12), (-33.87, 151.21, 8), (51.5, -0.12, 17)])
+def test_pixel_round_trip(lat, lng, zoom):
+    x, y = latlng_to_pixel(lat, lng, zoom)
+
+    assert pixel_to_latlng(float(x), float(y), zoom) == pytest.approx((lat, lng))
+
+
+def test_tile_bbox_contains_its_point():
+    x, y = latlng_to_pixel(30.34, 76.38, 12)
+    min_lng, min_lat, max_lng, max_lat = tile_bbox(int(x), int(y), 12)
+
+    assert min_lng <= 76.38 <= max_lng
+    assert min_lat <= 30.34 <= max_lat
@@ -11,7 +11,7 @@ const Dashboard = () => {
   const fetchIncidents = async () => {
     try {
       const data = await incidentService.getIncidents();
-      setIncidents(data);
+      setIncidents(data.incidents || []);
       setError('');
     } catch (err) {
       console.error('Error fetching incidents:', err);
@@ -21,11 +21,62 @@ const Dashboard = () => {
     }
   };
 
+  // Newest first; an "updated" event replaces the incident in place, an
+  // unknown one (e.g. an older incident) is inserted by created_at
+  const applyIncident = (incident) => {
+    setIncidents((current) => {
+      const index = current.findIndex((item) => item.id === incident.id);
+      if (index === -1) {
+        const position = current.findIndex(
+          (item) => new Date(item.created_at) < new Date(incident.created_at)
+        );
+        if (position === -1) {
+          return [...current, incident];
+        }
+        return [...current.slice(0, position), incident, ...current.slice(position)];
+      }
+      const next = [...current];
+      next[index] = incident;
+      return next;
+    });
+  };
+
   useEffect(() => {
-    fetchIncidents();
-    // Set up auto-refresh every 30 seconds
-    const interval = setInterval(fetchIncidents, 30000);
-    return () => clearInterval(interval);
+    let interval = null;
+    // Fall back to polling every 30 seconds if streaming is unavailable
+    const startPolling = () => {
+      if (!interval) {
+        interval = setInterval(fetchIncidents, 30000);
+      }
+    };
+
+    const source = incidentService.streamIncidents({
+      onIncident: applyIncident,
+      onReset: fetchIncidents,
+      onOpen: () => {
+        // (Re)connected: load the current list, stop polling if it was running
+        clearInterval(interval);
+        interval = null;
+        fetchIncidents();
+      },
+      onError: () => {
+        if (source && source.readyState === EventSource.CLOSED) {
+          startPolling();
+        }
+      },
+    });
+
+    if (!source) {
+      fetchIncidents();
+      startPolling();
+    }
+
+    return () => {
+      if (source) {
+        source.close();
+      }
+      clearInterval(interval);
+    };
   }, []);
 
   const styles = {
@@ -102,12 +153,12 @@ const Dashboard = () => {
         {error && <div style={styles.error}>{error}</div>}
         <ul style={styles.list}>
           {incidents.slice(0, 10).map((incident, index) => (
-            <li key={index} style={styles.listItem}>
-              <strong>{incident.type}</strong>
+            <li key={incident.id ?? index} style={styles.listItem}>
+              <strong>{incident.title}</strong>
               <br />
               <small>
-                {new Date(incident.timestamp).toLocaleDateString()} at{' '}
-                {new Date(incident.timestamp).toLocaleTimeString()}
+                {new Date(incident.created_at).toLocaleDateString()} at{' '}
+                {new Date(incident.created_at).toLocaleTimeString()}
               </small>
               <p>{incident.description}</p>
             </li>
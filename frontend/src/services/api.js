@@ -9,6 +9,18 @@ const api = axios.create({
   },
 });
 
+const TOKEN_KEY = 'accessToken';
+
+// Session token from /api/users/login; sent on every request so incident
+// reports are attributed to the user without passing ?user_id=
+api.interceptors.request.use((config) => {
+  const token = localStorage.getItem(TOKEN_KEY);
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
 export const userService = {
   register: async (userData) => {
     try {
@@ -22,11 +34,16 @@ export const userService = {
   login: async (credentials) => {
     try {
       const response = await api.post('/api/users/login', credentials);
+      localStorage.setItem(TOKEN_KEY, response.data.access_token);
       return response.data;
     } catch (error) {
       throw error.response?.data || error.message;
     }
   },
+
+  logout: () => {
+    localStorage.removeItem(TOKEN_KEY);
+  },
 };
 
 export const incidentService = {
@@ -47,6 +64,27 @@ export const incidentService = {
       throw error.response?.data || error.message;
     }
   },
+
+  // Server-Sent Events for new ("created") and classified ("updated")
+  // incidents; "refresh" (after bulk changes) and "reset" mean reload the
+  // list. Returns the EventSource, or null if the browser lacks it.
+  streamIncidents: ({ onIncident, onReset, onOpen, onError, category } = {}) => {
+    if (typeof EventSource === 'undefined') {
+      return null;
+    }
+
+    const query = category ? `?category=${encodeURIComponent(category)}` : '';
+    const source = new EventSource(`${API_BASE_URL}/api/incidents/stream${query}`);
+    const handle = (event) => onIncident?.(JSON.parse(event.data), event.type);
+
+    source.addEventListener('created', handle);
+    source.addEventListener('updated', handle);
+    source.addEventListener('reset', () => onReset?.());
+    source.addEventListener('refresh', () => onReset?.());
+    source.onopen = () => onOpen?.();
+    source.onerror = (event) => onError?.(event);
+    return source;
+  },
 };
 
 export default api;
\ No newline at end of file